@@ -0,0 +1,62 @@
+"""Measure cold import times of distrello's entry points with ``python -X importtime``.
+
+Usage: python benchmarks/import_time.py [module ...] [--top N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess  # noqa: S404
+import sys
+from typing import NamedTuple
+
+DEFAULT_MODULES = (
+    "distrello.db.models",  # migrations and admin scripts
+    "distrello.api",  # standalone OAuth/webhook server
+    "distrello.bot",  # bot process, cogs are loaded later as extensions
+)
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def measure(module: str) -> list[ImportTime]:
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times: list[ImportTime] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        times.append(ImportTime(name.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=10, help="Number of heaviest imports to show")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        times = measure(module)
+        total = next(t.cumulative_us for t in times if t.module == module)
+        print(f"{module}: {total / 1000:.1f} ms")  # noqa: T201
+
+        heaviest = sorted(
+            (t for t in times if "." not in t.module), key=lambda t: t.cumulative_us, reverse=True
+        )
+        for t in heaviest[: args.top]:
+            print(f"  {t.module:<30} {t.cumulative_us / 1000:>8.1f} ms")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,23 @@
 from __future__ import annotations
 
+import base64
+import hashlib
+import hmac
+import json
+import multiprocessing
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
 from aiohttp import web
 from loguru import logger
 
 from distrello.db.orm import Database
+from distrello.ipc import post_to_cluster
+from distrello.utils.config import CONFIG
+from distrello.utils.logging import setup_logging
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
 
 html = """
 <!DOCTYPE html>
@@ -48,12 +62,35 @@ html = """
 
 
 class TrelloOAuthCallbackHandler:
-    def __init__(self) -> None:
+    """HTTP server for Trello OAuth callbacks and webhooks.
+
+    It can run embedded in the bot's event loop (sharing the bot's database and HTTP session) or
+    standalone in its own processes, in which case work is handed to the bot over IPC.
+    """
+
+    def __init__(
+        self, db: Database | None = None, session: aiohttp.ClientSession | None = None
+    ) -> None:
         self.app = web.Application()
         self.app.router.add_get("/callback", self.handle_callback)
         self.app.router.add_post("/save_token", self.save_token_endpoint)
+        self.app.router.add_route("HEAD", "/webhook", self.webhook_check_endpoint)
+        self.app.router.add_post("/webhook", self.webhook_endpoint)
+        self.app.cleanup_ctx.append(self._session_ctx)
+
+        self.db = db or Database()
+        self.session = session
+        self._runner: web.AppRunner | None = None
+
+    async def _session_ctx(self, _: web.Application) -> AsyncGenerator[None, None]:
+        owns_session = self.session is None
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+
+        yield
 
-        self.db = Database()
+        if owns_session:
+            await self.session.close()
 
     async def handle_callback(self, _: web.Request) -> web.Response:
         return web.Response(text=html, content_type="text/html")
@@ -80,11 +117,98 @@ class TrelloOAuthCallbackHandler:
             raise ValueError(msg)
 
         server.api_token = token
+        server.needs_reauth = False
         await self.db.update_server(server)
 
-    async def run(self, port: int = 6721) -> None:
-        runner = web.AppRunner(self.app)
-        await runner.setup()
-        site = web.TCPSite(runner, "localhost", port)
+    async def webhook_check_endpoint(self, _: web.Request) -> web.Response:
+        # Trello sends a HEAD request to verify the callback URL when a webhook is created
+        return web.Response()
+
+    @staticmethod
+    def is_valid_signature(body: bytes, signature: str | None) -> bool:
+        """Check a webhook request's X-Trello-Webhook header.
+
+        Trello signs the body followed by the callback URL with HMAC-SHA1 using the API secret.
+        """
+        if CONFIG.trello_api_secret is None or signature is None:
+            return False
+
+        digest = hmac.digest(
+            CONFIG.trello_api_secret.encode(), body + CONFIG.webhook_url.encode(), hashlib.sha1
+        )
+        return hmac.compare_digest(base64.b64encode(digest).decode(), signature)
+
+    async def webhook_endpoint(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        if not self.is_valid_signature(body, request.headers.get("X-Trello-Webhook")):
+            return web.Response(text="Invalid signature", status=401)
+
+        try:
+            data = json.loads(body)
+            board_id: str = data["model"]["id"]
+            action: dict[str, Any] = data["action"]
+        except (ValueError, TypeError, KeyError):
+            return web.Response(text="Invalid JSON or missing model or action", status=400)
+
+        server = await self.db.get_server_by_board_id(board_id)
+        if server is None:
+            # Trello deletes webhooks that respond with 410
+            return web.Response(text=f"Board {board_id!r} is not linked", status=410)
+
+        assert self.session is not None
+        try:
+            await post_to_cluster(
+                self.session,
+                server.id,
+                "/trello_event",
+                {"action": action},
+                shard_count=CONFIG.shard_count,
+            )
+        except Exception:
+            logger.exception(f"Error handing Trello action for board {board_id!r} to the bot")
+            # Trello retries webhooks that fail
+            return web.Response(text="Bot unavailable", status=503)
+
+        return web.Response()
+
+    async def start(self) -> None:
+        """Start the server in the running event loop."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, CONFIG.api_host, CONFIG.api_port)
         await site.start()
-        logger.info(f"OAuth callback server running on http://localhost:{port}/callback")
+        logger.info(f"OAuth callback server running on http://{CONFIG.api_host}:{CONFIG.api_port}")
+
+    async def close(self) -> None:
+        """Stop accepting connections and wait for in-flight requests to finish."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def run_worker(worker_id: int) -> None:
+    setup_logging(f"logs/api-{worker_id}.log")
+    handler = TrelloOAuthCallbackHandler()
+    web.run_app(
+        handler.app,
+        host=CONFIG.api_host,
+        port=CONFIG.api_port,
+        reuse_port=CONFIG.api_workers > 1,
+        print=None,
+    )
+
+
+def run_standalone() -> None:
+    """Run the server in CONFIG.api_workers processes sharing the same port."""
+    if CONFIG.api_workers == 1:
+        run_worker(0)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = [
+        ctx.Process(target=run_worker, args=(worker_id,), name=f"api-{worker_id}")
+        for worker_id in range(CONFIG.api_workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
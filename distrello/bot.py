@@ -1,7 +1,7 @@
 from __future__ import annotations
 
+import asyncio
 import uuid
-from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
 import discord
@@ -13,15 +13,38 @@ from distrello.db.orm import Database
 from distrello.errors import BotError
 from distrello.utils.config import CONFIG
 from distrello.utils.embeds import ErrorEmbed
+from distrello.utils.sharding import get_shard_id
 
 if TYPE_CHECKING:
     import aiohttp
 
     from distrello.utils.types import Interaction
 
+COGS = (
+    "distrello.cogs.link",
+    "distrello.cogs.sync",
+    "distrello.cogs.importer",
+    "distrello.cogs.outbox",
+    "distrello.cogs.profile",
+)
+"""Extensions loaded on startup, in order."""
+DEBUG_EXTENSIONS = ("jishaku",)
+"""Extensions only loaded in dev or when CONFIG.debug_extensions is set."""
 
-class Distrello(commands.Bot):
-    def __init__(self, session: aiohttp.ClientSession) -> None:
+
+class Distrello(commands.AutoShardedBot):
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        *,
+        cluster_id: int = 0,
+        shard_ids: list[int] | None = None,
+        shard_count: int | None = None,
+    ) -> None:
+        # Without shard IDs, discord.py runs every shard in this process
+        sharding: dict[str, Any] = (
+            {} if shard_ids is None else {"shard_ids": shard_ids, "shard_count": shard_count}
+        )
         super().__init__(
             commands.when_mentioned,
             intents=discord.Intents.default(),
@@ -29,26 +52,44 @@ class Distrello(commands.Bot):
                 guild=True, dm_channel=False, private_channel=False
             ),
             tree_cls=CommandTree,
+            **sharding,
         )
         self.session = session
         self.db = Database()
+        self.cluster_id = cluster_id
+        self._warm_task: asyncio.Task[None] | None = None
 
     @property
     def oauth_redirect_url(self) -> str:
-        if CONFIG.env == "dev":
-            return "http://localhost:6721/callback"
-        return "https://distrello.seria.moe/callback"
+        return f"{CONFIG.public_url}/callback"
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether this process runs the shard that receives events for a guild."""
+        # shard_count is always passed along with shard_ids, see __init__
+        if self.shard_ids is None:
+            return True
+        return get_shard_id(guild_id, self.shard_count) in self.shard_ids
 
     async def _load_cogs(self) -> None:
-        for cog in Path("distrello/cogs").rglob("*.py"):
+        extensions: list[str] = list(COGS)
+        if CONFIG.env == "dev" or CONFIG.debug_extensions:
+            extensions.extend(DEBUG_EXTENSIONS)
+
+        for extension in extensions:
             try:
-                await self.load_extension(".".join(cog.with_suffix("").parts))
+                await self.load_extension(extension)
             except Exception:
-                logger.exception(f"Failed to load cog {cog.stem!r}")
+                logger.exception(f"Failed to load extension {extension!r}")
             else:
-                logger.info(f"Loaded cog {cog.stem!r}")
+                logger.info(f"Loaded extension {extension!r}")
 
-        await self.load_extension("jishaku")
+    async def _warm_caches(self) -> None:
+        try:
+            await self.db.warm_forum_cache()
+        except Exception:
+            logger.exception("Failed to warm the forum link cache")
+        else:
+            logger.info("Warmed the forum link cache")
 
     @staticmethod
     def get_error_embed(e: Exception) -> ErrorEmbed:
@@ -75,3 +116,8 @@ class Distrello(commands.Bot):
 
     async def setup_hook(self) -> None:
         await self._load_cogs()
+
+    async def on_ready(self) -> None:
+        # READY fires again after reconnects, only warm the caches once
+        if self._warm_task is None:
+            self._warm_task = asyncio.create_task(self._warm_caches())
@@ -4,10 +4,17 @@ from typing import TYPE_CHECKING
 
 from discord import app_commands
 
+from distrello.utils.scheduler import TrelloWork, set_trello_work
+
 if TYPE_CHECKING:
     from distrello.utils.types import Interaction
 
 
 class CommandTree(app_commands.CommandTree):
+    async def interaction_check(self, i: Interaction) -> bool:
+        # Each command runs in its own task, so this only classifies this command's calls
+        set_trello_work(TrelloWork.INTERACTIVE, i.guild_id or 0)
+        return True
+
     async def on_error(self, i: Interaction, e: app_commands.AppCommandError) -> None:
         await i.client.respond_to_error(i, e)
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from typing import TYPE_CHECKING, Any
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+from loguru import logger
+
+from distrello.db.models import ThreadCardLink
+from distrello.errors import (
+    AccountNotLinkedError,
+    BoardNotLinkedError,
+    BotError,
+    ListNotLinkedError,
+)
+from distrello.sync.completion import is_thread_completed
+from distrello.sync.engine import get_card_hash
+from distrello.sync.render import render_description
+from distrello.utils.embeds import DefaultEmbed
+from distrello.utils.locks import forum_lock
+from distrello.utils.scheduler import TrelloWork, trello_work
+from distrello.utils.trello import iter_list_cards
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from distrello.bot import Distrello
+    from distrello.db.models import ForumListLink, ServerBoardLink
+    from distrello.utils.types import Interaction
+
+BATCH_SIZE = 25
+"""Number of cards handled per batch, links are written once per batch."""
+THREAD_INTERVAL = 1.0
+"""Seconds to wait between creating forum posts, keeps clear of Discord's rate limits."""
+
+
+class ListImporter:
+    """Create a forum post for every card in a Trello list that isn't linked to a thread yet.
+
+    Already linked cards are skipped, so an interrupted import resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        bot: Distrello,
+        server: ServerBoardLink,
+        forum: ForumListLink,
+        channel: discord.ForumChannel,
+    ) -> None:
+        self.bot = bot
+        self.server = server
+        self.forum = forum
+        self.channel = channel
+
+        self.imported = 0
+        self.skipped = 0
+        self.failed = 0
+
+        self._completed_tag_ids: set[int] = set()
+
+    async def _get_tag_map(self) -> dict[str, discord.ForumTag]:
+        db_tags = await self.bot.db.get_tags(self.forum.id)
+        tag_map: dict[str, discord.ForumTag] = {}
+        for db_tag in db_tags:
+            tag = self.channel.get_tag(db_tag.id)
+            if db_tag.label_id is not None and tag is not None:
+                tag_map[db_tag.label_id] = tag
+            if db_tag.is_completed_tag:
+                self._completed_tag_ids.add(db_tag.id)
+        return tag_map
+
+    def _get_synced_hash(
+        self, thread: discord.Thread, message: discord.Message, tag_map: dict[str, discord.ForumTag]
+    ) -> str:
+        """Hash the card as the next sync would see it for the new thread.
+
+        Posts are truncated and only carry mapped labels, so without this the next sync would
+        overwrite the card's full description and labels with the post's.
+        """
+        list_id = self.forum.list_id
+        if self.server.completed_list_id is not None and is_thread_completed(
+            thread, self._completed_tag_ids
+        ):
+            list_id = self.server.completed_list_id
+
+        label_ids = [label_id for label_id, tag in tag_map.items() if tag in thread.applied_tags]
+        return get_card_hash(thread.name, render_description(message), list_id, label_ids)
+
+    async def _create_thread(
+        self, card: dict[str, Any], tag_map: dict[str, discord.ForumTag]
+    ) -> ThreadCardLink | None:
+        name = card["name"][:100] or "Untitled card"
+        content = (card["desc"] or card["name"])[:2000]
+        tags = [tag_map[label_id] for label_id in card["idLabels"] if label_id in tag_map]
+
+        try:
+            created = await self.channel.create_thread(
+                name=name, content=content, applied_tags=tags[:5]
+            )
+        except discord.HTTPException:
+            logger.exception(f"Error creating thread for card {card['id']!r}")
+            return None
+
+        return ThreadCardLink(
+            id=created.thread.id,
+            forum_id=self.forum.id,
+            card_id=card["id"],
+            synced_hash=self._get_synced_hash(created.thread, created.message, tag_map),
+        )
+
+    async def run(self, on_progress: Callable[[ListImporter], Awaitable[Any]]) -> None:
+        assert self.server.api_token is not None
+        tag_map = await self._get_tag_map()
+
+        cards = iter_list_cards(
+            self.bot.session, api_token=self.server.api_token, list_id=self.forum.list_id
+        )
+        batch: list[dict[str, Any]] = []
+        async for card in cards:
+            batch.append(card)
+            if len(batch) == BATCH_SIZE:
+                await self._import_batch(batch, tag_map)
+                await on_progress(self)
+                batch.clear()
+
+        if batch:
+            await self._import_batch(batch, tag_map)
+            await on_progress(self)
+
+    async def _import_batch(
+        self, cards: list[dict[str, Any]], tag_map: dict[str, discord.ForumTag]
+    ) -> None:
+        # Hold the forum lock until the links are written, or a sync could see the new
+        # threads before their links and create duplicate cards for them
+        async with forum_lock(self.forum.id):
+            linked = await self.bot.db.get_linked_card_ids([card["id"] for card in cards])
+            links: list[ThreadCardLink] = []
+
+            try:
+                for card in cards:
+                    if card["id"] in linked:
+                        self.skipped += 1
+                        continue
+
+                    link = await self._create_thread(card, tag_map)
+                    if link is None:
+                        self.failed += 1
+                    else:
+                        links.append(link)
+                        self.imported += 1
+
+                    await asyncio.sleep(THREAD_INTERVAL)
+            finally:
+                # Write the links even when interrupted, so resuming doesn't duplicate posts
+                if links:
+                    await self.bot.db.upsert_threads(links)
+
+    def get_embed(self, *, done: bool) -> DefaultEmbed:
+        return DefaultEmbed(
+            title="Import Finished" if done else "Importing Cards...",
+            description=f"Imported: {self.imported}\nAlready imported: {self.skipped}\nFailed: {self.failed}",
+        )
+
+
+class ImportCog(commands.GroupCog, name="import"):
+    def __init__(self, bot: Distrello) -> None:
+        self.bot = bot
+        self._imports: dict[int, asyncio.Task[None]] = {}
+        """Running imports by forum ID."""
+
+    async def cog_unload(self) -> None:
+        for task in self._imports.values():
+            task.cancel()
+
+    async def _run_import(self, importer: ListImporter, message: discord.Message) -> None:
+        """Run an import in the background, reporting progress by editing a channel message.
+
+        Large lists take longer than an interaction token lives, so this doesn't use one.
+        """
+
+        async def edit(embed: discord.Embed) -> None:
+            # Losing the progress message shouldn't stop the import
+            with contextlib.suppress(discord.HTTPException):
+                await message.edit(embed=embed)
+
+        try:
+            with trello_work(TrelloWork.BULK, importer.channel.guild.id):
+                await importer.run(lambda importer: edit(importer.get_embed(done=False)))
+        except Exception as e:
+            await edit(self.bot.get_error_embed(e))
+        else:
+            await edit(importer.get_embed(done=True))
+        finally:
+            del self._imports[importer.channel.id]
+
+    @app_commands.command(
+        name="list", description="Import every card in a linked Trello list as posts in a forum"
+    )
+    async def import_list(self, i: Interaction, channel: discord.ForumChannel) -> Any:
+        if i.guild is None:
+            return
+        if not isinstance(i.channel, discord.abc.Messageable):
+            msg = "Run this command in a text channel, import progress is posted there"
+            raise BotError(msg)
+
+        server = await self.bot.db.get_server(i.guild.id)
+        if server is None or server.api_token is None:
+            raise AccountNotLinkedError
+
+        if server.board_id is None:
+            raise BoardNotLinkedError
+
+        forum = await self.bot.db.get_forum(channel.id)
+        if forum is None:
+            raise ListNotLinkedError
+
+        if channel.id in self._imports:
+            msg = "An import is already running for this forum"
+            raise BotError(msg)
+
+        importer = ListImporter(self.bot, server, forum, channel)
+        try:
+            message = await i.channel.send(embed=importer.get_embed(done=False))
+        except discord.HTTPException:
+            msg = "I can't send messages in this channel, import progress is posted here"
+            raise BotError(msg) from None
+
+        self._imports[channel.id] = asyncio.create_task(self._run_import(importer, message))
+        embed = DefaultEmbed(
+            title="Import Started", description=f"Progress is posted at {message.jump_url}"
+        )
+        await i.response.send_message(embed=embed, ephemeral=True)
+
+
+async def setup(bot: Distrello) -> None:
+    await bot.add_cog(ImportCog(bot))
@@ -13,6 +13,7 @@ from distrello.ui.link.link_labels import LinkLabelsView
 from distrello.ui.link.link_list import LinkListView
 from distrello.utils.config import CONFIG
 from distrello.utils.embeds import DefaultEmbed, ErrorEmbed
+from distrello.utils.reads import get_board_labels, get_board_lists, get_boards
 
 if TYPE_CHECKING:
     from distrello.bot import Distrello
@@ -72,8 +73,7 @@ class LinkCog(commands.GroupCog, name="link"):
         if server is None or server.api_token is None:
             raise AccountNotLinkedError
 
-        async with server.trello as trello:
-            boards = await trello.get_boards()
+        boards = await get_boards(self.bot.session, api_token=server.api_token)
 
         if not boards:
             embed = ErrorEmbed(
@@ -112,8 +112,9 @@ class LinkCog(commands.GroupCog, name="link"):
         if server.board_id is None:
             raise BoardNotLinkedError
 
-        async with server.trello as trello:
-            lists = await trello.get_board_lists(server.board_id)
+        lists = await get_board_lists(
+            self.bot.session, api_token=server.api_token, board_id=server.board_id
+        )
 
         forum = await self.bot.db.get_forum(channel.id)
         current = None if forum is None else forum.list_id
@@ -121,6 +122,30 @@ class LinkCog(commands.GroupCog, name="link"):
         view = LinkListView(lists, channel.id, current)
         await view.start(i)
 
+    @app_commands.command(
+        name="completed",
+        description="Link a Trello list that cards of closed or completed threads are moved to",
+    )
+    async def link_completed(self, i: Interaction) -> Any:
+        if i.guild is None:
+            return
+
+        await i.response.defer(ephemeral=True)
+
+        server = await self.bot.db.get_server(i.guild.id)
+        if server is None or server.api_token is None:
+            raise AccountNotLinkedError
+
+        if server.board_id is None:
+            raise BoardNotLinkedError
+
+        lists = await get_board_lists(
+            self.bot.session, api_token=server.api_token, board_id=server.board_id
+        )
+
+        view = LinkListView(lists, None, server.completed_list_id)
+        await view.start(i)
+
     @app_commands.command(
         name="labels", description="Link tags in a Discord forum channel to Trello labels"
     )
@@ -146,8 +171,9 @@ class LinkCog(commands.GroupCog, name="link"):
         if server.board_id is None:
             raise BoardNotLinkedError
 
-        async with server.trello as trello:
-            labels = await trello.get_board_labels(server.board_id)
+        labels = await get_board_labels(
+            self.bot.session, api_token=server.api_token, board_id=server.board_id, with_color=True
+        )
 
         if not labels:
             embed = ErrorEmbed(
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import datetime
+import itertools
+from typing import TYPE_CHECKING, Any
+
+from discord import app_commands
+from discord.ext import commands, tasks
+from loguru import logger
+
+from distrello.sync.engine import SyncDiscordToTrello
+from distrello.sync.outbox import MAX_ATTEMPTS, get_retry_at
+from distrello.sync.plan import load_operation
+from distrello.utils.breaker import get_breaker
+from distrello.utils.embeds import DefaultEmbed
+from distrello.utils.locks import guild_lock, is_guild_locked
+from distrello.utils.scheduler import TrelloWork, set_trello_work
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from distrello.bot import Distrello
+    from distrello.db.models import OutboxItem
+    from distrello.utils.types import Interaction
+
+DRAIN_INTERVAL = 10.0
+"""Seconds between checks for writes that are due for a retry."""
+DRAIN_LIMIT = 100
+"""Maximum number of writes retried per check."""
+WORKER_COUNT = 4
+"""Number of guilds whose writes are retried at the same time."""
+
+
+@app_commands.default_permissions(manage_guild=True)
+class OutboxCog(commands.GroupCog, name="outbox"):
+    """Retries Trello writes that failed during syncs, see distrello.sync.outbox."""
+
+    def __init__(self, bot: Distrello) -> None:
+        self.bot = bot
+        self._workers = asyncio.Semaphore(WORKER_COUNT)
+
+    async def cog_load(self) -> None:
+        self.drain.start()
+
+    async def cog_unload(self) -> None:
+        self.drain.cancel()
+
+    @tasks.loop(seconds=DRAIN_INTERVAL)
+    async def drain(self) -> None:
+        now = datetime.datetime.now(datetime.UTC)
+        # Other clusters retry the writes of the guilds they own
+        items = await self.bot.db.get_due_outbox_items(
+            now, limit=DRAIN_LIMIT, shard_ids=self.bot.shard_ids, shard_count=self.bot.shard_count
+        )
+
+        by_guild: dict[int, list[OutboxItem]] = collections.defaultdict(list)
+        for item in items:
+            by_guild[item.guild_id].append(item)
+
+        await asyncio.gather(*itertools.starmap(self._retry_guild, by_guild.items()))
+
+    @drain.before_loop
+    async def before_drain(self) -> None:
+        await self.bot.wait_until_ready()
+
+    async def _retry_guild(self, guild_id: int, items: Sequence[OutboxItem]) -> None:
+        # A sync of the guild is running and may redo these writes, retry on a later drain
+        # instead of waiting for it
+        if is_guild_locked(guild_id):
+            return
+
+        guild = self.bot.get_guild(guild_id)
+        server = await self.bot.db.get_server(guild_id)
+        if guild is None or server is None or server.api_token is None:
+            return
+
+        syncer = SyncDiscordToTrello(self.bot, guild, remove_extra=False)
+        breaker = get_breaker(server.api_token)
+
+        # gather() runs each guild in its own task, so this doesn't leak to other guilds
+        set_trello_work(TrelloWork.BULK, guild_id)
+        # Worker slots are only taken once the lock is held, so waiting never blocks other guilds
+        async with guild_lock(guild_id), self._workers:
+            for item in items:
+                # Waiting out an open circuit doesn't count as an attempt
+                if breaker.is_open:
+                    return
+
+                try:
+                    succeeded = await syncer.retry_operation(
+                        server, load_operation(item.operation, item.payload)
+                    )
+                except Exception:
+                    logger.exception(f"Error retrying {item.id=}")
+                    succeeded = False
+
+                await self._record_attempt(item, succeeded=succeeded)
+
+    async def _record_attempt(self, item: OutboxItem, *, succeeded: bool) -> None:
+        if succeeded:
+            await self.bot.db.delete_outbox_items([item.id])
+            return
+
+        now = datetime.datetime.now(datetime.UTC)
+        attempts = item.attempts + 1
+        if attempts >= MAX_ATTEMPTS:
+            await self.bot.db.dead_letter_outbox_item(item, now)
+            logger.warning(f"Moved {item.id=} to the dead letters after {attempts} attempts")
+            return
+
+        await self.bot.db.reschedule_outbox_item(
+            item.id, attempts=attempts, next_attempt_at=get_retry_at(attempts, now)
+        )
+
+    @app_commands.command(name="status", description="Show Trello writes waiting to be retried")
+    async def status(self, i: Interaction) -> Any:
+        if i.guild is None:
+            return
+
+        queued, dead = await self.bot.db.get_outbox_counts(i.guild.id)
+        embed = DefaultEmbed(
+            title="Outbox",
+            description=f"Waiting for a retry: {queued}\nFailed too many times: {dead}",
+        )
+        await i.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(
+        name="replay", description="Retry Trello writes that failed too many times"
+    )
+    async def replay(self, i: Interaction) -> Any:
+        if i.guild is None:
+            return
+
+        now = datetime.datetime.now(datetime.UTC)
+        count = await self.bot.db.replay_dead_letters(i.guild.id, now)
+        embed = DefaultEmbed(
+            title="Replay Scheduled",
+            description=f"{count} failed writes will be retried shortly."
+            if count
+            else "There are no failed writes to retry.",
+        )
+        await i.response.send_message(embed=embed, ephemeral=True)
+
+
+async def setup(bot: Distrello) -> None:
+    await bot.add_cog(OutboxCog(bot))
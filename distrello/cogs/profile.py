@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import io
+from typing import TYPE_CHECKING, Any
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from distrello.errors import InvalidInputError, OwnerOnlyError
+from distrello.sync.engine import SyncDiscordToTrello
+from distrello.utils.embeds import DefaultEmbed
+from distrello.utils.profiler import SamplingProfiler, dump_collapsed
+
+if TYPE_CHECKING:
+    from distrello.bot import Distrello
+    from distrello.utils.profiler import Profile
+    from distrello.utils.types import Interaction
+
+MAX_SECONDS = 300
+"""Longest the whole bot can be profiled for at once."""
+
+
+@app_commands.default_permissions(administrator=True)
+class ProfileCog(commands.GroupCog, name="profile"):
+    """Owner only commands that profile the running bot, see distrello.utils.profiler."""
+
+    def __init__(self, bot: Distrello) -> None:
+        self.bot = bot
+        self._lock = asyncio.Lock()
+
+    async def _check_owner(self, i: Interaction) -> None:
+        # Raised in the command so the error reaches CommandTree.on_error as a BotError
+        if not await self.bot.is_owner(i.user):
+            raise OwnerOnlyError
+
+    @staticmethod
+    def _get_files(profile: Profile) -> list[discord.File]:
+        contents = {
+            "report.txt": profile.get_report(),
+            "loop.collapsed.txt": dump_collapsed(profile.loop_stacks),
+            "tasks.collapsed.txt": dump_collapsed(profile.task_stacks),
+        }
+        return [
+            discord.File(io.BytesIO(content.encode()), filename=filename)
+            for filename, content in contents.items()
+        ]
+
+    async def _send_profile(self, i: Interaction, profile: Profile, *, title: str) -> None:
+        embed = DefaultEmbed(
+            title=title,
+            description=f"Profiled for {profile.duration:.1f}s, the loop was busy "
+            f"{profile.busy:.1%} of the time.\nThe `.collapsed.txt` files can be opened "
+            "in speedscope or rendered with flamegraph.pl.",
+        )
+        await i.followup.send(embed=embed, files=self._get_files(profile), ephemeral=True)
+
+    @app_commands.command(name="sync", description="Profile a sync of a server")
+    @app_commands.describe(
+        server_id="ID of the server to sync, defaults to this server",
+        dry_run="Only profile planning the sync, without changing anything",
+    )
+    async def sync(
+        self, i: Interaction, server_id: str | None = None, dry_run: bool = False
+    ) -> Any:
+        if i.guild is None:
+            return
+        await self._check_owner(i)
+
+        if server_id is None:
+            guild = i.guild
+        else:
+            if not server_id.isdecimal():
+                msg = f"`{server_id}` is not a server ID."
+                raise InvalidInputError(msg)
+            guild = self.bot.get_guild(int(server_id))
+            if guild is None:
+                msg = f"Server `{server_id}` isn't handled by this process."
+                raise InvalidInputError(msg)
+
+        await i.response.defer(ephemeral=True)
+
+        syncer = SyncDiscordToTrello(self.bot, guild, remove_extra=False)
+        async with self._lock, SamplingProfiler(new_tasks_only=True) as profiler:
+            # Run the sync in a task created while profiling so its await chain is sampled
+            await asyncio.create_task(syncer.plan() if dry_run else syncer.sync())
+
+        await self._send_profile(i, profiler.profile, title=f"Sync Profile of {guild.name}")
+
+    @app_commands.command(name="run", description="Profile the whole bot for a while")
+    @app_commands.describe(seconds="How long to profile for")
+    async def run(
+        self, i: Interaction, seconds: app_commands.Range[int, 1, MAX_SECONDS] = 30
+    ) -> Any:
+        await self._check_owner(i)
+        await i.response.defer(ephemeral=True)
+
+        async with self._lock, SamplingProfiler() as profiler:
+            await asyncio.sleep(seconds)
+
+        await self._send_profile(i, profiler.profile, title="Bot Profile")
+
+
+async def setup(bot: Distrello) -> None:
+    await bot.add_cog(ProfileCog(bot))
@@ -1,346 +1,250 @@
 from __future__ import annotations
 
-from collections.abc import Sequence
+import asyncio
 from typing import TYPE_CHECKING, Any
 
 import discord
-import trello
 from discord import app_commands
 from discord.ext import commands
 from loguru import logger
 
-from distrello.db.models import ForumListLink
-from distrello.errors import AccountNotLinkedError
+from distrello.errors import BotError
+from distrello.sync.attachments import get_attachment_links
+from distrello.sync.completion import CardMove, CardMover, is_thread_completed
+from distrello.sync.engine import SyncBudget, SyncDiscordToTrello, get_card_hash, get_tag_diff
+from distrello.sync.render import render_description
 
 if TYPE_CHECKING:
     from distrello.bot import Distrello
-    from distrello.db.models import ServerBoardLink
+    from distrello.sync.engine import SyncResult
+    from distrello.sync.plan import SyncPlan
     from distrello.utils.types import Interaction
 
+BACKGROUND_SYNC_SECONDS = 120.0
+"""Time budget of syncs triggered by webhooks, the rest is left for the next sync."""
+BACKGROUND_SYNC_OPERATIONS = 300
+"""Operation budget of syncs triggered by webhooks."""
+WEBHOOK_SYNC_DELAY = 30.0
+"""Seconds to wait after a Trello action before syncing, so bursts of actions sync once."""
+SYNC_ACTION_TYPES = frozenset(
+    {
+        "updateCard",
+        "deleteCard",
+        "addLabelToCard",
+        "removeLabelFromCard",
+        "updateLabel",
+        "deleteLabel",
+        "updateList",
+        "moveListFromBoard",
+    }
+)
+"""Trello actions that can make the board drift from Discord, see distrello.api for webhooks."""
 
-def get_tag_name(tag: discord.ForumTag) -> str:
-    """Get the name of a tag, including the unicode emoji if present."""
-    if tag.emoji is not None and tag.emoji.is_unicode_emoji():
-        return f"{tag.emoji.name} {tag.name}"
-    return tag.name
 
-
-class SyncDiscordToTrello:
-    def __init__(self, bot: Distrello, guild: discord.Guild, *, remove_extra: bool) -> None:
+class SyncCog(commands.Cog):
+    def __init__(self, bot: Distrello) -> None:
         self.bot = bot
-        self.guild = guild
-        self.remove_extra = remove_extra
+        self.mover = CardMover(bot)
+        self._webhook_syncs: dict[int, asyncio.Task[None]] = {}
+
+    async def cog_unload(self) -> None:
+        self.mover.close()
+        for task in self._webhook_syncs.values():
+            task.cancel()
+
+    async def sync_server(
+        self, server_id: int, *, remove: bool = False
+    ) -> tuple[SyncPlan, SyncResult] | None:
+        """Sync a guild in the background, e.g. after a webhook, within the background budget."""
+        try:
+            guild = self.bot.get_guild(server_id) or await self.bot.fetch_guild(server_id)
+        except discord.HTTPException:
+            logger.warning(f"Guild {server_id} not found")
+            return None
+
+        budget = SyncBudget(seconds=BACKGROUND_SYNC_SECONDS, operations=BACKGROUND_SYNC_OPERATIONS)
+        return await SyncDiscordToTrello(self.bot, guild, remove_extra=remove, budget=budget).sync()
+
+    async def _webhook_sync(self, guild_id: int) -> None:
+        await asyncio.sleep(WEBHOOK_SYNC_DELAY)
+        # Actions from now on, including the sync's own writes, schedule another sync. It
+        # converges since unchanged cards and labels aren't written again.
+        del self._webhook_syncs[guild_id]
 
-    async def _create_label_and_link(
-        self, server: ServerBoardLink, forum: ForumListLink, tag: discord.ForumTag
-    ) -> None:
         try:
-            async with server.trello as api:
-                label = await api.create_label(
-                    trello.TrelloLabelCreate(
-                        name=get_tag_name(tag),
-                        color=trello.get_random_label_color(),
-                        board_id=forum.board_id,
-                    )
-                )
+            synced = await self.sync_server(guild_id)
+        except BotError as e:
+            logger.warning(f"Skipped syncing guild {guild_id}: {e.embed.title}")
+            return
         except Exception:
-            logger.exception(f"Error creating label for {tag=}")
+            logger.exception(f"Error syncing guild {guild_id}")
             return
 
-        await self.bot.db.create_tag(forum_id=forum.id, tag_id=tag.id, label_id=label.id)
-
-    async def _sync_tags(
-        self, server: ServerBoardLink, forum: ForumListLink, tags: Sequence[discord.ForumTag]
-    ) -> None:
-        async with server.trello as api:
-            try:
-                labels = await api.get_board_labels(forum.board_id)
-            except Exception:
-                logger.exception(f"Error fetching labels for {forum=}")
-                return
-
-        label_map = {label.name: label.id for label in labels}
-        tag_names = {get_tag_name(tag) for tag in tags}
-
-        for tag in tags:
-            link = await self.bot.db.get_tag(tag.id)
-            if link is not None:
-                continue
-
-            # Is there an existing label with the same name?
-            tag_name = get_tag_name(tag)
-
-            if tag_name in label_map:
-                label_id = tag_name
-                await self.bot.db.create_tag(forum_id=forum.id, tag_id=tag.id, label_id=label_id)
-                logger.debug(f"Created link between {tag.id=} and {label_id=}")
-            else:
-                # Create a new label and link it to the tag
-                await self._create_label_and_link(server, forum, tag)
-                logger.debug(f"Created label {tag_name!r} for {tag.id=} and linked them")
-
-        # Remove labels in Trello that are not in Discord
-        if not self.remove_extra:
+        if synced is None:
+            return
+        _, result = synced
+        if result.deferred or result.deferred_threads:
+            logger.info(
+                f"Left {result.deferred} operations and {result.deferred_threads} threads "
+                f"of guild {guild_id} for the next sync"
+            )
+
+    @commands.Cog.listener()
+    async def on_trello_action(self, guild_id: int, action: dict[str, Any]) -> None:
+        """Sync a guild after changes on its board, dispatched by distrello.ipc for webhooks."""
+        if action.get("type") not in SYNC_ACTION_TYPES or guild_id in self._webhook_syncs:
             return
 
-        for label in labels:
-            if label.name in tag_names:
-                continue
+        self._webhook_syncs[guild_id] = asyncio.create_task(self._webhook_sync(guild_id))
 
-            async with server.trello as api:
-                try:
-                    await api.delete_label(label.id)
-                except Exception:
-                    logger.exception(f"Error deleting label {label.id=} from Trello")
-                    continue
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message) -> None:
+        # Only starter messages of forum posts share their ID with the thread
+        channel = message.channel
+        if not isinstance(channel, discord.Thread) or message.id != channel.id:
+            return
+        if not isinstance(channel.parent, discord.ForumChannel):
+            return
 
-            await self.bot.db.delete_tag_by_label_id(label.id)
-            logger.debug(f"Deleted label {label.id=} and its link from the database")
+        forum = await self.bot.db.get_forum(channel.parent.id)
+        if forum is None:
+            return
 
-    async def _sync_threads(
-        self, server: ServerBoardLink, forum: ForumListLink, threads: Sequence[discord.Thread]
-    ) -> None:
-        for thread in threads:
-            db_thread = await self.bot.db.get_thread(thread.id)
-            db_tags = await self.bot.db.get_tags(forum.id)
-
-            db_tags_map = {tag.id: tag for tag in db_tags}
-            tag_label_map = {tag.id: tag.label_id for tag in db_tags if tag.label_id is not None}
-
-            tags = thread.applied_tags
-
-            if db_thread is None:
-                message = thread.starter_message or await thread.fetch_message(thread.id)
-                description = message.content if message else ""
-
-                try:
-                    async with server.trello as api:
-                        label_ids = [tag.label_id for tag in db_tags if tag.label_id is not None]
-                        card = await api.create_card(
-                            trello.TrelloCardCreate(
-                                name=thread.name,
-                                description=description,
-                                list_id=forum.list_id,
-                                label_ids=label_ids,
-                            )
-                        )
-                except Exception:
-                    logger.exception(f"Error creating card for {thread=}")
-                    continue
-
-                db_thread = await self.bot.db.create_thread(
-                    thread_id=thread.id, forum_id=forum.id, card_id=card.id
-                )
-            else:
-                try:
-                    async with server.trello as api:
-                        message = thread.starter_message or await thread.fetch_message(thread.id)
-                        description = message.content if message else ""
-
-                        await api.update_card(
-                            trello.TrelloCardUpdate(
-                                id=db_thread.card_id,
-                                name=thread.name,
-                                description=description,
-                                list_id=forum.list_id,
-                                label_ids=[
-                                    tag.label_id for tag in db_tags if tag.label_id is not None
-                                ],
-                            )
-                        )
-                except Exception:
-                    logger.exception(f"Error updating card for {thread=}")
-                    continue
-
-    async def _sync_forum(self, server: ServerBoardLink, forum: ForumListLink) -> None:
-        guild = self.guild
+        await self.bot.db.set_starter_message(
+            thread_id=channel.id, forum_id=forum.id, content=render_description(message)
+        )
+        await self.bot.db.upsert_attachments(get_attachment_links(channel.id, message))
 
-        try:
-            channel = guild.get_channel(forum.id) or await guild.fetch_channel(forum.id)
-        except (discord.NotFound, discord.Forbidden):
-            logger.warning(f"Channel {forum.id} not found in guild {guild.id}")
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent) -> None:
+        if payload.message_id != payload.channel_id:
             return
 
-        if not isinstance(channel, discord.ForumChannel):
-            logger.warning(f"Channel {forum.id} is not a forum channel")
+        await self.bot.db.update_starter_message(
+            payload.channel_id, render_description(payload.message)
+        )
+
+        # Only starter messages of linked forums are cached
+        if payload.message.attachments and await self.bot.db.get_starter_message(
+            payload.channel_id
+        ):
+            await self.bot.db.upsert_attachments(
+                get_attachment_links(payload.channel_id, payload.message)
+            )
+
+    @commands.Cog.listener()
+    async def on_thread_update(self, before: discord.Thread, after: discord.Thread) -> None:
+        """Move the card to or from the completed list when a thread is closed or reopened."""
+        if not isinstance(after.parent, discord.ForumChannel):
             return
-
-        tags = channel.available_tags
-        if not tags:
+        if (before.archived, before.locked, before.applied_tags) == (
+            after.archived,
+            after.locked,
+            after.applied_tags,
+        ):
             return
 
-        await self._sync_tags(server, forum, tags)
-
-    async def sync(self) -> None:
-        guild = self.guild
-
-        server = await self.bot.db.get_server(guild.id)
-        if server is None:
-            raise AccountNotLinkedError
+        db_thread = await self.bot.db.get_thread(after.id)
+        if db_thread is None or db_thread.is_dead:
+            return
 
-        forums = await self.bot.db.get_forums(guild.id)
-        for forum in forums:
-            await self._sync_forum(server, forum)
+        server = await self.bot.db.get_server(after.guild.id)
+        if server is None or server.completed_list_id is None:
+            return
 
+        db_tags = await self.bot.db.get_tags(after.parent.id)
+        completed_tag_ids = {tag.id for tag in db_tags if tag.is_completed_tag}
+        completed = is_thread_completed(after, completed_tag_ids)
+        if completed == is_thread_completed(before, completed_tag_ids):
+            return
 
-class SyncCog(commands.Cog):
-    def __init__(self, bot: Distrello) -> None:
-        self.bot = bot
+        forum = await self.bot.db.get_forum(after.parent.id)
+        if forum is None:
+            return
 
-    async def get_thread_card_description(self, thread: discord.Thread) -> str:
-        try:
-            message = thread.starter_message or await thread.fetch_message(thread.id)
-        except discord.NotFound:
-            return ""
-        else:
-            return message.content
-
-    async def get_thread_label_ids(self, forum_id: int) -> list[str]:
-        db_tags = await self.bot.db.get_tags(forum_id)
-        return [tag.label_id for tag in db_tags if tag.label_id is not None]
-
-    async def _sync_discord_to_trello(self, guild: discord.Guild, *, remove: bool) -> None:
-        server = await self.bot.db.get_server(guild.id)
-        if server is None:
-            raise AccountNotLinkedError
-
-        forums = await self.bot.db.get_forums(guild.id)
-        for forum in forums:
-            try:
-                channel = guild.get_channel(forum.id) or await guild.fetch_channel(forum.id)
-            except (discord.NotFound, discord.Forbidden):
-                logger.warning(f"Channel {forum.id} not found in guild {guild.id}")
-                continue
-
-            if not isinstance(channel, discord.ForumChannel):
-                logger.warning(f"Channel {forum.id} is not a forum channel")
-                continue
-
-            # Sync tags to Trello labels
-            tags = channel.available_tags
-            if not tags:
-                continue
-
-    async def sync_forum(
-        self, forum_id: int, guild: discord.Guild, server: ServerBoardLink
+        list_id = server.completed_list_id if completed else forum.list_id
+        synced_hash = moved_hash = None
+        # Only the list changes on Trello, the name and labels stay as the card had them
+        starter = await self.bot.db.get_starter_message(after.id)
+        if starter is not None:
+            label_map = {tag.id: tag.label_id for tag in db_tags if tag.label_id is not None}
+            label_ids = [label_map[tag.id] for tag in before.applied_tags if tag.id in label_map]
+            old_list_id = forum.list_id if completed else server.completed_list_id
+            synced_hash = get_card_hash(before.name, starter.content, old_list_id, label_ids)
+            moved_hash = get_card_hash(before.name, starter.content, list_id, label_ids)
+
+        self.mover.add(
+            after.guild.id,
+            CardMove(
+                thread_id=after.id,
+                card_id=db_thread.card_id,
+                list_id=list_id,
+                synced_hash=synced_hash,
+                moved_hash=moved_hash,
+            ),
+        )
+
+    @commands.Cog.listener()
+    async def on_raw_thread_delete(self, payload: discord.RawThreadDeleteEvent) -> None:
+        await self.bot.db.delete_thread(payload.thread_id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(
+        self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
     ) -> None:
-        try:
-            channel = guild.get_channel(forum_id) or await guild.fetch_channel(forum_id)
-        except (discord.NotFound, discord.Forbidden):
-            logger.warning(f"Channel {forum_id} not found in guild {guild.id}")
+        if not isinstance(before, discord.ForumChannel) or not isinstance(
+            after, discord.ForumChannel
+        ):
             return
 
-        if not isinstance(channel, discord.ForumChannel):
-            msg = f"Channel {channel.id!r} is not a forum channel"
-            raise TypeError(msg)
+        diff = get_tag_diff(before.available_tags, after.available_tags)
+        if not diff:
+            return
 
-        forum = await self.bot.db.get_forum(forum_id)
+        forum = await self.bot.db.get_forum(after.id)
         if forum is None:
-            msg = f"Forum {forum_id!r} not found in database"
-            raise ValueError(msg)
+            return
 
-        tags = channel.available_tags
-        if not tags:
+        server = await self.bot.db.get_server(after.guild.id)
+        if server is None or server.api_token is None:
             return
 
-        # Sync tags with Trello
-        for tag in tags:
-            db_tag = await self.bot.db.get_tag(tag.id)
-            if db_tag is None:
-                try:
-                    async with server.trello as api:
-                        label = await api.create_label(
-                            trello.TrelloLabelCreate(
-                                name=tag.name,
-                                color=trello.get_random_label_color(),
-                                board_id=forum.board_id,
-                            )
-                        )
-                except Exception:
-                    logger.exception(f"Error creating label for {tag=}")
-                    continue
-
-                db_tag = await self.bot.db.create_tag(
-                    forum_id=forum.id, tag_id=tag.id, label_id=label.id
-                )
-
-        # Sync threads with Trello
-        for thread in channel.threads:
-            db_thread = await self.bot.db.get_thread(thread.id)
-            db_tags = await self.bot.db.get_tags(forum.id)
-
-            if db_thread is None:
-                try:
-                    async with server.trello as api:
-                        try:
-                            message = thread.starter_message or await thread.fetch_message(
-                                thread.id
-                            )
-                        except discord.NotFound:
-                            description = ""
-                        else:
-                            description = message.content
-
-                        label_ids = [tag.label_id for tag in db_tags if tag.label_id is not None]
-                        card = await api.create_card(
-                            trello.TrelloCardCreate(
-                                name=thread.name,
-                                description=description,
-                                list_id=forum.list_id,
-                                label_ids=label_ids,
-                            )
-                        )
-                except Exception:
-                    logger.exception(f"Error creating card for {thread=}")
-                    continue
-
-                db_thread = await self.bot.db.create_thread(
-                    thread_id=thread.id, forum_id=forum.id, card_id=card.id
-                )
-            else:
-                try:
-                    async with server.trello as api:
-                        message = thread.starter_message or await thread.fetch_message(thread.id)
-                        description = message.content
-
-                        await api.update_card(
-                            trello.TrelloCardUpdate(
-                                id=db_thread.card_id,
-                                name=thread.name,
-                                description=description,
-                                list_id=forum.list_id,
-                                label_ids=[
-                                    tag.label_id for tag in db_tags if tag.label_id is not None
-                                ],
-                            )
-                        )
-                except Exception:
-                    logger.exception(f"Error updating card for {thread=}")
-                    continue
-
-    async def sync_server(self, server_id: int) -> None:
-        server = await self.bot.db.get_server(server_id)
-        if server is None:
-            raise AccountNotLinkedError
-
-        # Sync all forums in the server
-        forums = await self.bot.db.get_forums(server_id)
-        for forum in forums:
-            try:
-                guild = self.bot.get_guild(server_id) or await self.bot.fetch_guild(server_id)
-            except discord.HTTPException:
-                logger.warning(f"Guild {server_id} not found")
-                continue
-
-            await self.sync_forum(forum.id, guild, server)
+        syncer = SyncDiscordToTrello(self.bot, after.guild, remove_extra=False)
+        await syncer.apply_tag_diff(server, forum, diff)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel) -> None:
+        if not isinstance(channel, discord.ForumChannel):
+            return
+        await self.bot.db.delete_forum(channel.id)
 
     @app_commands.command(name="sync", description="Sync the server with Trello")
-    async def sync(self, i: Interaction) -> Any:
+    @app_commands.describe(
+        remove="Delete Trello labels that don't match any forum tag",
+        dry_run="Only show what the sync would change, without changing anything",
+    )
+    async def sync(self, i: Interaction, remove: bool = False, dry_run: bool = False) -> Any:
         if i.guild is None:
             return
 
         await i.response.defer(ephemeral=True)
-        await self.sync_server(i.guild.id)
+
+        syncer = SyncDiscordToTrello(self.bot, i.guild, remove_extra=remove)
+        if dry_run:
+            plan = await syncer.plan()
+            await i.followup.send(embed=plan.get_embed(title="Sync Plan (Dry Run)"))
+            return
+
+        plan, result = await syncer.sync()
+        embed = plan.get_embed(title="Sync Finished")
+        footer = f"Succeeded: {result.succeeded}, failed: {result.failed}"
+        if result.deferred or result.deferred_threads:
+            footer += (
+                f", left for the next sync: {result.deferred} operations, "
+                f"{result.deferred_threads} threads"
+            )
+        embed.set_footer(text=footer)
+        await i.followup.send(embed=embed)
 
 
 async def setup(bot: Distrello) -> None:
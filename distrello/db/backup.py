@@ -0,0 +1,123 @@
+"""Stream all link data to and from a line-delimited JSON file.
+
+Usage:
+    python -m distrello.db.backup export links.jsonl.gz
+    python -m distrello.db.backup import links.jsonl.gz
+
+Each line is ``{"table": ..., "row": {...}}``. Paths ending in ``.gz`` are gzip compressed.
+Importing expects an empty database with the schema already created (``alembic upgrade head``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal, TextIO
+
+from loguru import logger
+from sqlalchemy import insert, select
+
+from distrello.db.models import (
+    AttachmentLink,
+    ForumListLink,
+    ServerBoardLink,
+    StarterMessageCache,
+    TagLabelLink,
+    ThreadCardLink,
+)
+from distrello.db.session import engine
+
+if TYPE_CHECKING:
+    from sqlalchemy import Table
+
+CHUNK_SIZE = 1000
+"""Number of rows fetched or inserted at a time."""
+
+TABLES: tuple[Table, ...] = tuple(
+    model.__table__  # pyright: ignore[reportAttributeAccessIssue]
+    for model in (
+        ServerBoardLink,
+        ForumListLink,
+        TagLabelLink,
+        ThreadCardLink,
+        StarterMessageCache,
+        AttachmentLink,
+    )
+)
+"""Tables in foreign key order, parents are exported and imported before their children."""
+
+
+def open_file(path: Path, mode: Literal["r", "w"]) -> TextIO:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt" if mode == "r" else "wt", encoding="utf-8")
+    return path.open(mode, encoding="utf-8")
+
+
+async def export_links(path: Path) -> None:
+    with open_file(path, "w") as f:
+        async with engine.connect() as conn:
+            for table in TABLES:
+                count = 0
+                result = await conn.stream(
+                    select(table)
+                    .order_by(*table.primary_key.columns)
+                    .execution_options(yield_per=CHUNK_SIZE)
+                )
+                async for rows in result.mappings().partitions(CHUNK_SIZE):
+                    f.writelines(
+                        json.dumps({"table": table.name, "row": dict(row)}) + "\n" for row in rows
+                    )
+                    count += len(rows)
+
+                logger.info(f"Exported {count} rows from {table.name!r}")
+
+
+async def import_links(path: Path) -> None:
+    tables = {table.name: table for table in TABLES}
+    counts: dict[str, int] = dict.fromkeys(tables, 0)
+
+    async with engine.begin() as conn:
+        table_name: str | None = None
+        rows: list[dict[str, Any]] = []
+
+        async def flush() -> None:
+            if table_name is None or not rows:
+                return
+            await conn.execute(insert(tables[table_name]), rows)
+            counts[table_name] += len(rows)
+            rows.clear()
+
+        with open_file(path, "r") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["table"] != table_name or len(rows) >= CHUNK_SIZE:
+                    await flush()
+                    table_name = record["table"]
+                rows.append(record["row"])
+
+        await flush()
+
+    for name, count in counts.items():
+        logger.info(f"Imported {count} rows into {name!r}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Export or import all Distrello link data.")
+    parser.add_argument("action", choices=("export", "import"))
+    parser.add_argument("path", type=Path)
+    args = parser.parse_args()
+
+    try:
+        if args.action == "export":
+            await export_links(args.path)
+        else:
+            await import_links(args.path)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,10 @@
-import sqlmodel  # noqa: I002
-import trello
+import datetime  # noqa: I002
+from typing import TYPE_CHECKING
 
-from distrello.utils.config import CONFIG
+import sqlmodel
+
+if TYPE_CHECKING:
+    from distrello.utils.breaker import GuardedTrelloAPI
 
 
 class ServerBoardLink(sqlmodel.SQLModel, table=True):
@@ -13,22 +16,35 @@ class ServerBoardLink(sqlmodel.SQLModel, table=True):
     """Discord server ID."""
     api_token: str | None = None
     """Trello API token, None if not set yet."""
+    needs_reauth: bool = False
+    """Whether Trello rejected the API token, cleared when the token works again or is replaced."""
 
-    board_id: str | None = None
+    board_id: str | None = sqlmodel.Field(default=None, index=True)
     """Trello board ID, None if not set yet."""
     completed_list_id: str | None = None
     """Trello list ID for completed cards, None if not set yet."""
+    webhook_id: str | None = None
+    """ID of the Trello webhook watching the board, None if not registered yet."""
 
     # Relationships
     forums: list["ForumListLink"] = sqlmodel.Relationship(back_populates="server")
 
     @property
-    def trello(self) -> trello.TrelloAPI:
+    def trello(self) -> "GuardedTrelloAPI":
+        # Imported lazily so tools that only need the schema (e.g. migrations) stay light
+        import trello  # noqa: PLC0415
+
+        from distrello.utils.breaker import GuardedTrelloAPI, get_breaker  # noqa: PLC0415
+        from distrello.utils.config import CONFIG  # noqa: PLC0415
+
         if self.api_token is None:
             msg = "Accessing TrelloAPI before API token is set is forbidden."
             raise ValueError(msg)
 
-        return trello.TrelloAPI(api_key=CONFIG.trello_api_key, api_token=self.api_token)
+        api = trello.TrelloAPI(api_key=CONFIG.trello_api_key, api_token=self.api_token)
+        breaker = get_breaker(self.api_token)
+        breaker.load_needs_reauth(needs_reauth=self.needs_reauth)
+        return GuardedTrelloAPI(api, breaker)
 
 
 class ForumListLink(sqlmodel.SQLModel, table=True):
@@ -45,7 +61,9 @@ class ForumListLink(sqlmodel.SQLModel, table=True):
     """Trello list ID."""
 
     # Relationships
-    server_id: int = sqlmodel.Field(foreign_key="servers.id")
+    server_id: int = sqlmodel.Field(
+        foreign_key="servers.id", sa_type=sqlmodel.BigInteger, index=True
+    )
     server: "ServerBoardLink" = sqlmodel.Relationship(back_populates="forums")
     tags: list["TagLabelLink"] = sqlmodel.Relationship(back_populates="forum")
     threads: list["ThreadCardLink"] = sqlmodel.Relationship(back_populates="forum")
@@ -58,13 +76,13 @@ class TagLabelLink(sqlmodel.SQLModel, table=True):
 
     id: int = sqlmodel.Field(primary_key=True, sa_type=sqlmodel.BigInteger)
     """Discord forum tag ID."""
-    label_id: str | None = None
+    label_id: str | None = sqlmodel.Field(default=None, index=True)
     """Trello label ID this tag corresponds to, None if is_completed_tag is True."""
     is_completed_tag: bool = False
     """Whether this tag marks a card as completed."""
 
     # Relationships
-    forum_id: int = sqlmodel.Field(foreign_key="forums.id")
+    forum_id: int = sqlmodel.Field(foreign_key="forums.id", sa_type=sqlmodel.BigInteger, index=True)
     forum: "ForumListLink" = sqlmodel.Relationship(back_populates="tags")
 
 
@@ -72,12 +90,86 @@ class ThreadCardLink(sqlmodel.SQLModel, table=True):
     """A thread in Discord is a card in Trello."""
 
     __tablename__: str = "threads"
+    __table_args__ = (sqlmodel.Index("ix_threads_forum_id_is_dead", "forum_id", "is_dead"),)
 
     id: int = sqlmodel.Field(primary_key=True, sa_type=sqlmodel.BigInteger)
     """Discord thread ID."""
-    card_id: str
+    card_id: str = sqlmodel.Field(unique=True, index=True)
     """Trello card ID."""
+    is_dead: bool = False
+    """Whether the Trello card was deleted, dead links are skipped when syncing."""
+    synced_hash: str | None = None
+    """Hash of the card fields last written to Trello, None if not synced yet."""
+    last_synced_message_id: int | None = sqlmodel.Field(default=None, sa_type=sqlmodel.BigInteger)
+    """ID of the last reply mirrored as a card comment, None if no replies were mirrored yet."""
 
     # Relationships
-    forum_id: int = sqlmodel.Field(foreign_key="forums.id")
+    forum_id: int = sqlmodel.Field(foreign_key="forums.id", sa_type=sqlmodel.BigInteger)
     forum: "ForumListLink" = sqlmodel.Relationship(back_populates="threads")
+
+
+class StarterMessageCache(sqlmodel.SQLModel, table=True):
+    """Cached content of a forum thread's starter message, saves a fetch per thread when syncing."""
+
+    __tablename__: str = "starter_messages"
+
+    id: int = sqlmodel.Field(primary_key=True, sa_type=sqlmodel.BigInteger)
+    """Discord thread ID, which is also the starter message ID."""
+    forum_id: int = sqlmodel.Field(sa_type=sqlmodel.BigInteger, index=True)
+    """Discord forum ID."""
+    content: str
+    """Content of the starter message, rendered as a Trello card description."""
+    content_hash: str
+    """Hash of the content, used to tell if the content changed."""
+    updated_at: datetime.datetime | None = sqlmodel.Field(
+        default=None, sa_type=sqlmodel.DateTime(timezone=True)
+    )
+    """When an edit last changed the content, None if it wasn't edited since it was cached."""
+
+
+class AttachmentLink(sqlmodel.SQLModel, table=True):
+    """An attachment on a forum starter message in Discord is an attachment on a card in Trello."""
+
+    __tablename__: str = "attachments"
+
+    id: int = sqlmodel.Field(primary_key=True, sa_type=sqlmodel.BigInteger)
+    """Discord attachment ID."""
+    thread_id: int = sqlmodel.Field(sa_type=sqlmodel.BigInteger, index=True)
+    """Discord thread ID the starter message belongs to."""
+    filename: str
+    url: str
+    """Discord CDN URL, refreshed whenever the starter message is seen again."""
+    content_type: str | None = None
+    trello_attachment_id: str | None = None
+    """Trello attachment ID, None until uploaded."""
+
+
+class OutboxItem(sqlmodel.SQLModel, table=True):
+    """A Trello write that failed and is waiting to be retried."""
+
+    __tablename__: str = "outbox"
+
+    id: str = sqlmodel.Field(primary_key=True)
+    """Key of what the write targets, a newer failed write to the same target replaces it."""
+    guild_id: int = sqlmodel.Field(sa_type=sqlmodel.BigInteger, index=True)
+    operation: str
+    """Name of the sync operation type."""
+    payload: str
+    """JSON of the sync operation's fields."""
+    attempts: int = 0
+    next_attempt_at: datetime.datetime = sqlmodel.Field(
+        sa_type=sqlmodel.DateTime(timezone=True), index=True
+    )
+
+
+class DeadLetter(sqlmodel.SQLModel, table=True):
+    """A Trello write that failed too many times, kept until an admin replays it."""
+
+    __tablename__: str = "dead_letters"
+
+    id: str = sqlmodel.Field(primary_key=True)
+    guild_id: int = sqlmodel.Field(sa_type=sqlmodel.BigInteger, index=True)
+    operation: str
+    payload: str
+    attempts: int
+    failed_at: datetime.datetime = sqlmodel.Field(sa_type=sqlmodel.DateTime(timezone=True))
@@ -1,17 +1,80 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
-
-from sqlmodel import col, delete, select
-
-from distrello.db.models import ForumListLink, ServerBoardLink, TagLabelLink, ThreadCardLink
-from distrello.db.session import get_db
+import datetime
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import col, delete, select, update
+
+from distrello.db.models import (
+    AttachmentLink,
+    DeadLetter,
+    ForumListLink,
+    OutboxItem,
+    ServerBoardLink,
+    StarterMessageCache,
+    TagLabelLink,
+    ThreadCardLink,
+)
+from distrello.db.session import engine, get_db
+from distrello.utils.misc import hash_content
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
-
+    from collections.abc import Callable, Sequence
+
+    from sqlmodel import SQLModel
+
+
+def upsert(
+    model: type[SQLModel], rows: Sequence[dict[str, Any]], *, update_columns: Sequence[str]
+) -> Any:
+    """Build an ``INSERT ... ON CONFLICT (id) DO UPDATE`` statement for the engine's dialect."""
+    match engine.dialect.name:
+        case "postgresql":
+            stmt = postgresql.insert(model).values(rows)
+        case "sqlite":
+            stmt = sqlite.insert(model).values(rows)
+        case name:
+            msg = f"Upserts are not supported for the {name!r} dialect"
+            raise NotImplementedError(msg)
+
+    return stmt.on_conflict_do_update(
+        index_elements=["id"], set_={column: stmt.excluded[column] for column in update_columns}
+    )
+
+
+class Database:  # noqa: PLR0904
+    def __init__(self) -> None:
+        self._forum_cache: dict[int, ForumListLink] | None = None
+        """All forum links by ID, None until warm_forum_cache is called."""
+        self._pending_cache_writes: list[Callable[[dict[int, ForumListLink]], object]] | None = None
+        """Forum writes made while warm_forum_cache is loading, None when it isn't."""
+
+    async def warm_forum_cache(self) -> None:
+        """Load every forum link into memory so get_forum doesn't hit the database.
+
+        Once warmed, the cache is complete: a miss means the forum isn't linked.
+        """
+        self._pending_cache_writes = []
+        try:
+            async with get_db() as session:
+                result = await session.execute(select(ForumListLink))
+            cache = {forum.id: forum for forum in result.scalars().all()}
+
+            # Writes during the load may be missing from its result, replaying them is harmless
+            for write in self._pending_cache_writes:
+                write(cache)
+            self._forum_cache = cache
+        finally:
+            self._pending_cache_writes = None
+
+    def _write_forum_cache(self, write: Callable[[dict[int, ForumListLink]], object]) -> None:
+        if self._forum_cache is not None:
+            write(self._forum_cache)
+        elif self._pending_cache_writes is not None:
+            self._pending_cache_writes.append(write)
 
-class Database:
     async def get_server(self, server_id: int) -> ServerBoardLink | None:
         async with get_db() as session:
             stmt = select(ServerBoardLink).where(ServerBoardLink.id == server_id)
@@ -19,6 +82,13 @@ class Database:
 
         return result.scalars().first()
 
+    async def get_server_by_board_id(self, board_id: str) -> ServerBoardLink | None:
+        async with get_db() as session:
+            stmt = select(ServerBoardLink).where(ServerBoardLink.board_id == board_id)
+            result = await session.execute(stmt)
+
+        return result.scalars().first()
+
     async def create_server(self, server_id: int) -> ServerBoardLink:
         async with get_db() as session:
             server = ServerBoardLink(id=server_id)
@@ -36,6 +106,17 @@ class Database:
 
         return server
 
+    async def set_needs_reauth(self, api_token: str, *, needs_reauth: bool) -> None:
+        """Flag every server using the token, tokens can be shared by servers linked by one user."""
+        async with get_db() as session:
+            stmt = (
+                update(ServerBoardLink)
+                .where(col(ServerBoardLink.api_token) == api_token)
+                .values(needs_reauth=needs_reauth)
+            )
+            await session.execute(stmt)
+            await session.commit()
+
     async def delete_server(self, server_id: int) -> None:
         async with get_db() as session:
             stmt = delete(ServerBoardLink).where(col(ServerBoardLink.id) == server_id)
@@ -50,6 +131,9 @@ class Database:
         return result.scalars().all()
 
     async def get_forum(self, forum_id: int) -> ForumListLink | None:
+        if self._forum_cache is not None:
+            return self._forum_cache.get(forum_id)
+
         async with get_db() as session:
             stmt = select(ForumListLink).where(ForumListLink.id == forum_id)
             result = await session.execute(stmt)
@@ -67,6 +151,7 @@ class Database:
             await session.commit()
             await session.refresh(forum)
 
+        self._write_forum_cache(lambda cache: cache.__setitem__(forum.id, forum))
         return forum
 
     async def update_forum(self, forum: ForumListLink) -> ForumListLink:
@@ -75,14 +160,51 @@ class Database:
             await session.commit()
             await session.refresh(forum)
 
+        self._write_forum_cache(lambda cache: cache.__setitem__(forum.id, forum))
         return forum
 
-    async def delete_forum(self, forum: ForumListLink) -> None:
+    async def delete_forum(self, forum_id: int) -> None:
+        """Delete a forum link along with all of its tag and thread links."""
         async with get_db() as session:
-            session.add(forum)
-            await session.delete(forum)
+            await session.execute(
+                delete(TagLabelLink).where(col(TagLabelLink.forum_id) == forum_id)
+            )
+            await session.execute(
+                delete(AttachmentLink).where(
+                    col(AttachmentLink.thread_id).in_(
+                        select(ThreadCardLink.id).where(col(ThreadCardLink.forum_id) == forum_id)
+                    )
+                )
+            )
+            await session.execute(
+                delete(ThreadCardLink).where(col(ThreadCardLink.forum_id) == forum_id)
+            )
+            await session.execute(
+                delete(StarterMessageCache).where(col(StarterMessageCache.forum_id) == forum_id)
+            )
+            await session.execute(delete(ForumListLink).where(col(ForumListLink.id) == forum_id))
             await session.commit()
 
+        self._write_forum_cache(lambda cache: cache.pop(forum_id, None))
+
+    async def move_forums(self, forum_ids: Sequence[int], board_id: str) -> None:
+        """Point forums whose lists were moved to another Trello board at that board."""
+        async with get_db() as session:
+            stmt = (
+                update(ForumListLink)
+                .where(col(ForumListLink.id).in_(forum_ids))
+                .values(board_id=board_id)
+            )
+            await session.execute(stmt)
+            await session.commit()
+
+        def write(cache: dict[int, ForumListLink]) -> None:
+            for forum_id in forum_ids:
+                if (forum := cache.get(forum_id)) is not None:
+                    forum.board_id = board_id
+
+        self._write_forum_cache(write)
+
     async def get_tags(self, forum_id: int) -> Sequence[TagLabelLink]:
         async with get_db() as session:
             stmt = select(TagLabelLink).where(TagLabelLink.forum_id == forum_id)
@@ -97,14 +219,19 @@ class Database:
 
         return result.scalars().first()
 
-    async def create_tag(self, *, forum_id: int, tag_id: int, label_id: str | None) -> TagLabelLink:
+    async def upsert_tag(self, *, forum_id: int, tag_id: int, label_id: str | None) -> TagLabelLink:
+        """Create or update a tag link in a single statement."""
+        forum_tag = TagLabelLink(
+            id=tag_id, forum_id=forum_id, label_id=label_id, is_completed_tag=label_id is None
+        )
         async with get_db() as session:
-            forum_tag = TagLabelLink(
-                id=tag_id, forum_id=forum_id, label_id=label_id, is_completed_tag=label_id is None
+            stmt = upsert(
+                TagLabelLink,
+                [forum_tag.model_dump()],
+                update_columns=("forum_id", "label_id", "is_completed_tag"),
             )
-            session.add(forum_tag)
+            await session.execute(stmt)
             await session.commit()
-            await session.refresh(forum_tag)
 
         return forum_tag
 
@@ -116,6 +243,12 @@ class Database:
 
         return forum_tag
 
+    async def delete_tag(self, tag_id: int) -> None:
+        async with get_db() as session:
+            stmt = delete(TagLabelLink).where(col(TagLabelLink.id) == tag_id)
+            await session.execute(stmt)
+            await session.commit()
+
     async def delete_tag_by_label_id(self, label_id: str) -> None:
         async with get_db() as session:
             stmt = delete(TagLabelLink).where(col(TagLabelLink.label_id) == label_id)
@@ -129,11 +262,287 @@ class Database:
 
         return result.scalars().first()
 
-    async def create_thread(self, *, thread_id: int, forum_id: int, card_id: str) -> ThreadCardLink:
+    async def upsert_thread(
+        self, *, thread_id: int, forum_id: int, card_id: str, synced_hash: str | None = None
+    ) -> ThreadCardLink:
+        """Create or update a thread link in a single statement, bringing dead links back."""
+        forum_thread = ThreadCardLink(
+            id=thread_id, forum_id=forum_id, card_id=card_id, synced_hash=synced_hash
+        )
+        await self.upsert_threads([forum_thread])
+        return forum_thread
+
+    async def upsert_threads(self, threads: Sequence[ThreadCardLink]) -> None:
+        """Create or update many thread links in one statement."""
         async with get_db() as session:
-            forum_thread = ThreadCardLink(id=thread_id, forum_id=forum_id, card_id=card_id)
-            session.add(forum_thread)
+            stmt = upsert(
+                ThreadCardLink,
+                [thread.model_dump() for thread in threads],
+                update_columns=("forum_id", "card_id", "is_dead", "synced_hash"),
+            )
+            await session.execute(stmt)
             await session.commit()
-            await session.refresh(forum_thread)
 
-        return forum_thread
+    async def get_linked_card_ids(self, card_ids: Sequence[str]) -> set[str]:
+        """Get which of the given Trello cards are already linked to a thread."""
+        async with get_db() as session:
+            stmt = select(ThreadCardLink.card_id).where(col(ThreadCardLink.card_id).in_(card_ids))
+            result = await session.execute(stmt)
+
+        return set(result.scalars().all())
+
+    async def delete_thread(self, thread_id: int) -> None:
+        async with get_db() as session:
+            await session.execute(delete(ThreadCardLink).where(col(ThreadCardLink.id) == thread_id))
+            await session.execute(
+                delete(AttachmentLink).where(col(AttachmentLink.thread_id) == thread_id)
+            )
+            await session.execute(
+                delete(StarterMessageCache).where(col(StarterMessageCache.id) == thread_id)
+            )
+            await session.commit()
+
+    async def mark_thread_dead(self, thread_id: int) -> None:
+        """Mark a thread link as dead after its Trello card was deleted."""
+        async with get_db() as session:
+            stmt = (
+                update(ThreadCardLink)
+                .where(col(ThreadCardLink.id) == thread_id)
+                .values(is_dead=True)
+            )
+            await session.execute(stmt)
+            await session.commit()
+
+    async def set_thread_synced_hash(
+        self, thread_id: int, synced_hash: str, *, expected: str | None = None
+    ) -> None:
+        """Set the hash of a thread's card, only if it's still the expected one when passed."""
+        async with get_db() as session:
+            stmt = update(ThreadCardLink).where(col(ThreadCardLink.id) == thread_id)
+            if expected is not None:
+                stmt = stmt.where(col(ThreadCardLink.synced_hash) == expected)
+            stmt = stmt.values(synced_hash=synced_hash)
+            await session.execute(stmt)
+            await session.commit()
+
+    async def set_thread_cursor(self, thread_id: int, message_id: int) -> None:
+        """Set the last reply of a thread that was mirrored as a card comment."""
+        async with get_db() as session:
+            stmt = (
+                update(ThreadCardLink)
+                .where(col(ThreadCardLink.id) == thread_id)
+                .values(last_synced_message_id=message_id)
+            )
+            await session.execute(stmt)
+            await session.commit()
+
+    async def get_starter_message(self, thread_id: int) -> StarterMessageCache | None:
+        async with get_db() as session:
+            stmt = select(StarterMessageCache).where(StarterMessageCache.id == thread_id)
+            result = await session.execute(stmt)
+
+        return result.scalars().first()
+
+    async def set_starter_message(
+        self, *, thread_id: int, forum_id: int, content: str
+    ) -> StarterMessageCache:
+        async with get_db() as session:
+            message = await session.merge(
+                StarterMessageCache(
+                    id=thread_id,
+                    forum_id=forum_id,
+                    content=content,
+                    content_hash=hash_content(content),
+                )
+            )
+            await session.commit()
+
+        return message
+
+    async def update_starter_message(self, thread_id: int, content: str) -> None:
+        """Update the cached content of a starter message, does nothing if it isn't cached."""
+        content_hash = hash_content(content)
+        async with get_db() as session:
+            stmt = (
+                update(StarterMessageCache)
+                .where(
+                    col(StarterMessageCache.id) == thread_id,
+                    col(StarterMessageCache.content_hash) != content_hash,
+                )
+                .values(
+                    content=content,
+                    content_hash=content_hash,
+                    updated_at=datetime.datetime.now(datetime.UTC),
+                )
+            )
+            await session.execute(stmt)
+            await session.commit()
+
+    async def get_starter_message_updates(self, forum_id: int) -> dict[int, datetime.datetime]:
+        """Get when the edited starter messages of a forum were last changed, by thread ID."""
+        async with get_db() as session:
+            stmt = select(StarterMessageCache.id, StarterMessageCache.updated_at).where(
+                col(StarterMessageCache.forum_id) == forum_id,
+                col(StarterMessageCache.updated_at).is_not(None),
+            )
+            result = await session.execute(stmt)
+
+        return {thread_id: updated_at for thread_id, updated_at in result.all() if updated_at}
+
+    async def upsert_attachments(self, attachments: Sequence[AttachmentLink]) -> None:
+        """Record starter message attachments, refreshing the URLs of known ones."""
+        if not attachments:
+            return
+
+        async with get_db() as session:
+            stmt = upsert(
+                AttachmentLink,
+                [
+                    attachment.model_dump(exclude={"trello_attachment_id"})
+                    for attachment in attachments
+                ],
+                update_columns=("filename", "url", "content_type"),
+            )
+            await session.execute(stmt)
+            await session.commit()
+
+    async def get_pending_attachments(self, thread_ids: Sequence[int]) -> Sequence[AttachmentLink]:
+        """Get attachments of the given threads that haven't been uploaded to Trello yet."""
+        async with get_db() as session:
+            stmt = select(AttachmentLink).where(
+                col(AttachmentLink.thread_id).in_(thread_ids),
+                col(AttachmentLink.trello_attachment_id).is_(None),
+            )
+            result = await session.execute(stmt)
+
+        return result.scalars().all()
+
+    async def set_attachment_uploaded(self, attachment_id: int, trello_attachment_id: str) -> None:
+        async with get_db() as session:
+            stmt = (
+                update(AttachmentLink)
+                .where(col(AttachmentLink.id) == attachment_id)
+                .values(trello_attachment_id=trello_attachment_id)
+            )
+            await session.execute(stmt)
+            await session.commit()
+
+    async def upsert_outbox_items(self, items: Sequence[OutboxItem]) -> None:
+        """Queue failed writes, replacing queued writes to the same targets."""
+        if not items:
+            return
+
+        async with get_db() as session:
+            stmt = upsert(
+                OutboxItem,
+                [item.model_dump() for item in items],
+                update_columns=("guild_id", "operation", "payload", "attempts", "next_attempt_at"),
+            )
+            await session.execute(stmt)
+            await session.commit()
+
+    async def delete_outbox_items(self, item_ids: Sequence[str]) -> None:
+        if not item_ids:
+            return
+
+        async with get_db() as session:
+            await session.execute(delete(OutboxItem).where(col(OutboxItem.id).in_(item_ids)))
+            await session.commit()
+
+    async def get_due_outbox_items(
+        self,
+        now: datetime.datetime,
+        *,
+        limit: int,
+        shard_ids: Sequence[int] | None = None,
+        shard_count: int | None = None,
+    ) -> Sequence[OutboxItem]:
+        """Get writes due for a retry, only of guilds on the given shards if they're passed."""
+        async with get_db() as session:
+            stmt = select(OutboxItem).where(col(OutboxItem.next_attempt_at) <= now)
+            if shard_ids is not None and shard_count is not None:
+                # Same as get_shard_id, filtered before the limit so other shards' writes
+                # don't crowd out this process's
+                shard_id = col(OutboxItem.guild_id).op(">>")(22) % shard_count
+                stmt = stmt.where(shard_id.in_(shard_ids))
+            stmt = stmt.order_by(col(OutboxItem.next_attempt_at)).limit(limit)
+            result = await session.execute(stmt)
+
+        return result.scalars().all()
+
+    async def reschedule_outbox_item(
+        self, item_id: str, *, attempts: int, next_attempt_at: datetime.datetime
+    ) -> None:
+        async with get_db() as session:
+            stmt = (
+                update(OutboxItem)
+                .where(col(OutboxItem.id) == item_id)
+                .values(attempts=attempts, next_attempt_at=next_attempt_at)
+            )
+            await session.execute(stmt)
+            await session.commit()
+
+    async def dead_letter_outbox_item(self, item: OutboxItem, now: datetime.datetime) -> None:
+        """Move a write that failed too many times out of the outbox, in one transaction."""
+        async with get_db() as session:
+            await session.merge(
+                DeadLetter(
+                    id=item.id,
+                    guild_id=item.guild_id,
+                    operation=item.operation,
+                    payload=item.payload,
+                    attempts=item.attempts,
+                    failed_at=now,
+                )
+            )
+            await session.execute(delete(OutboxItem).where(col(OutboxItem.id) == item.id))
+            await session.commit()
+
+    async def replay_dead_letters(self, guild_id: int, now: datetime.datetime) -> int:
+        """Move a guild's dead letters back to the outbox, returns how many were moved."""
+        async with get_db() as session:
+            result = await session.execute(
+                select(DeadLetter).where(col(DeadLetter.guild_id) == guild_id)
+            )
+            dead_letters = result.scalars().all()
+            if not dead_letters:
+                return 0
+
+            stmt = upsert(
+                OutboxItem,
+                [
+                    OutboxItem(
+                        id=dead_letter.id,
+                        guild_id=dead_letter.guild_id,
+                        operation=dead_letter.operation,
+                        payload=dead_letter.payload,
+                        next_attempt_at=now,
+                    ).model_dump()
+                    for dead_letter in dead_letters
+                ],
+                update_columns=("operation", "payload", "attempts", "next_attempt_at"),
+            )
+            await session.execute(stmt)
+            await session.execute(delete(DeadLetter).where(col(DeadLetter.guild_id) == guild_id))
+            await session.commit()
+
+        return len(dead_letters)
+
+    async def get_outbox_items(self, guild_id: int) -> Sequence[OutboxItem]:
+        async with get_db() as session:
+            stmt = select(OutboxItem).where(col(OutboxItem.guild_id) == guild_id)
+            result = await session.execute(stmt)
+
+        return result.scalars().all()
+
+    async def get_outbox_counts(self, guild_id: int) -> tuple[int, int]:
+        """Get the number of queued and dead-lettered writes of a guild."""
+        async with get_db() as session:
+            queued = await session.execute(
+                select(func.count()).where(col(OutboxItem.guild_id) == guild_id)
+            )
+            dead = await session.execute(
+                select(func.count()).where(col(DeadLetter.guild_id) == guild_id)
+            )
+
+        return queued.scalar_one(), dead.scalar_one()
@@ -32,3 +32,34 @@ class BoardNotLinkedError(BotError):
 class InvalidInputError(BotError):
     def __init__(self, detail: str) -> None:
         super().__init__(title="Invalid Input", description=detail)
+
+
+class ListNotLinkedError(BotError):
+    def __init__(self) -> None:
+        super().__init__(
+            title="List not Linked",
+            description="This forum channel is not linked to a Trello list, use `/link list` to link it.",
+        )
+
+
+class TrelloReauthRequiredError(BotError):
+    def __init__(self) -> None:
+        super().__init__(
+            title="Trello Authorization Revoked",
+            description="Trello rejected this server's token, use `/link account` to link it again.",
+        )
+
+
+class TrelloUnavailableError(BotError):
+    def __init__(self) -> None:
+        super().__init__(
+            title="Trello Unavailable",
+            description="Trello is failing for this server right now, please try again later.",
+        )
+
+
+class OwnerOnlyError(BotError):
+    def __init__(self) -> None:
+        super().__init__(
+            title="Owner Only", description="Only the bot's owner can use this command."
+        )
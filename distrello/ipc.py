@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+from aiohttp import web
+from loguru import logger
+
+from distrello.utils.config import CONFIG
+from distrello.utils.sharding import get_cluster_id, get_shard_id
+
+if TYPE_CHECKING:
+    import aiohttp
+
+    from distrello.bot import Distrello
+
+
+def get_ipc_url(cluster_id: int) -> str:
+    return f"http://localhost:{CONFIG.ipc_port + cluster_id}"
+
+
+def get_guild_cluster_id(guild_id: int, shard_count: int | None) -> int:
+    """Get the cluster that owns a guild, cluster 0 re-routes if the shard count is unknown."""
+    if shard_count is None or CONFIG.cluster_count == 1:
+        return 0
+    return get_cluster_id(get_shard_id(guild_id, shard_count), CONFIG.cluster_count)
+
+
+class IPCServer:
+    """Local HTTP server that lets other processes hand guild-scoped work to this cluster."""
+
+    def __init__(self, bot: Distrello) -> None:
+        self.bot = bot
+        self.app = web.Application()
+        self.app.router.add_post("/trello_event", self.trello_event_endpoint)
+
+        self._runner: web.AppRunner | None = None
+
+    async def trello_event_endpoint(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        guild_id = int(data["guild_id"])
+
+        asyncio.create_task(dispatch_trello_event(self.bot, guild_id, data["action"]))  # noqa: RUF006
+        return web.Response(text="Event scheduled", status=202)
+
+    async def start(self) -> None:
+        port = CONFIG.ipc_port + self.bot.cluster_id
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "localhost", port)
+        await site.start()
+        logger.info(f"IPC server for cluster {self.bot.cluster_id} running on port {port}")
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+async def post_to_cluster(
+    session: aiohttp.ClientSession,
+    guild_id: int,
+    path: str,
+    payload: dict[str, Any],
+    *,
+    shard_count: int | None,
+) -> None:
+    """Send guild-scoped work to the IPC server of the cluster that owns the guild."""
+    cluster_id = get_guild_cluster_id(guild_id, shard_count)
+    async with session.post(
+        f"{get_ipc_url(cluster_id)}{path}", json={"guild_id": guild_id, **payload}
+    ) as resp:
+        resp.raise_for_status()
+
+
+async def dispatch_trello_event(bot: Distrello, guild_id: int, action: dict[str, Any]) -> None:
+    """Dispatch a Trello webhook action as an ``on_trello_action`` event in the owning cluster."""
+    if not bot.owns_guild(guild_id):
+        await post_to_cluster(
+            bot.session, guild_id, "/trello_event", {"action": action}, shard_count=bot.shard_count
+        )
+        return
+
+    bot.dispatch("trello_action", guild_id, action)
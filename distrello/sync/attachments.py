@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+import aiohttp
+from loguru import logger
+
+from distrello.db.models import AttachmentLink
+from distrello.utils.trello import request
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    import discord
+
+    from distrello.bot import Distrello
+
+UPLOAD_CONCURRENCY = 3
+"""Maximum number of attachments uploaded at the same time, across all guilds."""
+CHUNK_SIZE = 64 * 1024
+"""Bytes read from Discord's CDN at a time while streaming an upload."""
+
+_upload_semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+
+def get_attachment_links(thread_id: int, message: discord.Message) -> list[AttachmentLink]:
+    return [
+        AttachmentLink(
+            id=attachment.id,
+            thread_id=thread_id,
+            filename=attachment.filename,
+            url=attachment.url,
+            content_type=attachment.content_type,
+        )
+        for attachment in message.attachments
+    ]
+
+
+async def _upload(
+    session: aiohttp.ClientSession, *, api_token: str, card_id: str, attachment: AttachmentLink
+) -> str:
+    """Stream an attachment from Discord's CDN to a Trello card without buffering it."""
+    async with session.get(attachment.url) as resp:
+        resp.raise_for_status()
+
+        form = aiohttp.FormData()
+        form.add_field("name", attachment.filename)
+        form.add_field(
+            "file",
+            resp.content.iter_chunked(CHUNK_SIZE),
+            filename=attachment.filename,
+            content_type=attachment.content_type or "application/octet-stream",
+        )
+        trello_attachment = await request(
+            session, "POST", f"/cards/{card_id}/attachments", api_token=api_token, data=form
+        )
+
+    return trello_attachment["id"]
+
+
+async def _mirror_attachment(
+    bot: Distrello, *, api_token: str, card_id: str, attachment: AttachmentLink
+) -> bool:
+    async with _upload_semaphore:
+        try:
+            trello_attachment_id = await _upload(
+                bot.session, api_token=api_token, card_id=card_id, attachment=attachment
+            )
+        except aiohttp.ClientResponseError as e:
+            # CDN URLs expire, the attachment stays pending until the message is seen again
+            logger.warning(
+                f"Error uploading {attachment.id=} to {card_id=}: {e.status} {e.message}"
+            )
+            return False
+        except Exception:
+            logger.exception(f"Error uploading {attachment.id=} to {card_id=}")
+            return False
+
+    await bot.db.set_attachment_uploaded(attachment.id, trello_attachment_id)
+    return True
+
+
+async def mirror_attachments(
+    bot: Distrello, *, api_token: str, card_id: str, attachments: Sequence[AttachmentLink]
+) -> bool:
+    """Upload pending attachments to a card, returns whether all of them were uploaded.
+
+    Uploaded attachments are remembered by their Discord ID, so they're never uploaded twice.
+    """
+    results = await asyncio.gather(
+        *(
+            _mirror_attachment(bot, api_token=api_token, card_id=card_id, attachment=attachment)
+            for attachment in attachments
+        )
+    )
+    return all(results)
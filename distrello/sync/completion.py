@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from distrello.utils.breaker import get_breaker
+from distrello.utils.locks import guild_lock
+from distrello.utils.scheduler import TrelloWork, set_trello_work
+from distrello.utils.trello import is_not_found, move_card
+
+if TYPE_CHECKING:
+    from collections.abc import Container, Sequence
+
+    import discord
+
+    from distrello.bot import Distrello
+
+BATCH_DELAY = 5.0
+"""Seconds to wait for more moves in the same guild before moving the cards."""
+MOVE_INTERVAL = 0.2
+"""Seconds between card moves in a batch, keeps a batch well under Trello's per-token rate limit."""
+
+
+def is_thread_completed(thread: discord.Thread, completed_tag_ids: Container[int]) -> bool:
+    """Whether a thread's card belongs in the completed list."""
+    return (
+        thread.archived
+        or thread.locked
+        or any(tag.id in completed_tag_ids for tag in thread.applied_tags)
+    )
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class CardMove:
+    thread_id: int
+    card_id: str
+    list_id: str
+    synced_hash: str | None = None
+    """Card hash of the card in sync before the move, None if it can't be told."""
+    moved_hash: str | None = None
+    """Card hash of the same card in the new list, stored after the move so syncs skip it."""
+
+
+class CardMover:
+    """Move cards between lists in per-guild batches.
+
+    Moves made within BATCH_DELAY of each other are grouped, so triaging many threads at once
+    becomes one rate-limited batch instead of a request burst or a full sync.
+    """
+
+    def __init__(self, bot: Distrello) -> None:
+        self.bot = bot
+
+        self._pending: dict[int, dict[int, CardMove]] = {}
+        """Moves by thread ID by guild ID, a later move of the same thread replaces the earlier one."""
+        self._tasks: dict[int, asyncio.Task[None]] = {}
+
+    def add(self, guild_id: int, move: CardMove) -> None:
+        self._pending.setdefault(guild_id, {})[move.thread_id] = move
+        if guild_id not in self._tasks:
+            self._tasks[guild_id] = asyncio.create_task(self._flush_later(guild_id))
+
+    async def _flush_later(self, guild_id: int) -> None:
+        await asyncio.sleep(BATCH_DELAY)
+
+        # No awaits in between, so moves added from now on start a new batch
+        self._tasks.pop(guild_id, None)
+        moves = self._pending.pop(guild_id, {})
+
+        try:
+            await self._move_cards(guild_id, list(moves.values()))
+        except Exception:
+            logger.exception(f"Error moving cards in guild {guild_id}")
+
+    async def _move_cards(self, guild_id: int, moves: Sequence[CardMove]) -> None:
+        server = await self.bot.db.get_server(guild_id)
+        if server is None or server.api_token is None:
+            return
+
+        breaker = get_breaker(server.api_token)
+        set_trello_work(TrelloWork.EVENT, guild_id)  # Runs in the batch's own task
+        async with guild_lock(guild_id):
+            for move in moves:
+                if breaker.is_open:
+                    logger.warning(f"Dropped the remaining card moves in guild {guild_id}")
+                    return
+
+                try:
+                    await move_card(
+                        self.bot.session,
+                        api_token=server.api_token,
+                        card_id=move.card_id,
+                        list_id=move.list_id,
+                    )
+                except Exception as e:
+                    if is_not_found(e):
+                        await self.bot.db.mark_thread_dead(move.thread_id)
+                        logger.info(f"Card {move.card_id=} was deleted, marked link as dead")
+                    else:
+                        logger.exception(f"Error moving card {move.card_id=}")
+                else:
+                    # Cards with other changes keep their old hash, the next sync updates them
+                    if move.synced_hash is not None and move.moved_hash is not None:
+                        await self.bot.db.set_thread_synced_hash(
+                            move.thread_id, move.moved_hash, expected=move.synced_hash
+                        )
+
+                await asyncio.sleep(MOVE_INTERVAL)
+
+        logger.debug(f"Moved {len(moves)} cards in guild {guild_id}")
+
+    def close(self) -> None:
+        """Cancel pending batches, active threads are moved to the right list by the next sync."""
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self._pending.clear()
@@ -0,0 +1,877 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import time
+from typing import TYPE_CHECKING
+
+import discord
+import trello
+from loguru import logger
+
+from distrello.errors import AccountNotLinkedError
+from distrello.sync.attachments import get_attachment_links, mirror_attachments
+from distrello.sync.completion import is_thread_completed
+from distrello.sync.outbox import make_outbox_item
+from distrello.sync.plan import (
+    CreateCard,
+    CreateLabel,
+    DeleteLabel,
+    LinkLabel,
+    MirrorAttachments,
+    MirrorComments,
+    Operation,
+    RepointForums,
+    SyncPlan,
+    UpdateCard,
+    get_operation_key,
+    load_operation,
+)
+from distrello.sync.render import render_comment, render_description
+from distrello.utils.breaker import get_breaker
+from distrello.utils.config import CONFIG
+from distrello.utils.locks import forum_lock, guild_lock
+from distrello.utils.misc import hash_content
+from distrello.utils.reads import get_board_labels, get_board_lists
+from distrello.utils.scheduler import TrelloWork, trello_work
+from distrello.utils.trello import (
+    add_card_comment,
+    is_not_found,
+    is_rejected,
+    register_board_webhook,
+    update_label_name,
+)
+
+if TYPE_CHECKING:
+    import datetime
+    from collections.abc import Sequence
+
+    from distrello.bot import Distrello
+    from distrello.db.models import ForumListLink, ServerBoardLink
+    from distrello.utils.reads import TrelloLabel
+
+
+COMMENT_BATCH_SIZE = 50
+"""Maximum number of replies mirrored per thread per sync, the rest are left for the next sync."""
+REPLY_TYPES = (discord.MessageType.default, discord.MessageType.reply)
+
+
+def get_tag_name(tag: discord.ForumTag) -> str:
+    """Get the name of a tag, including the unicode emoji if present."""
+    if tag.emoji is not None and tag.emoji.is_unicode_emoji():
+        return f"{tag.emoji.name} {tag.name}"
+    return tag.name
+
+
+@dataclasses.dataclass(slots=True)
+class TagDiff:
+    """Changes to a forum's available tags between two channel updates."""
+
+    added: list[discord.ForumTag]
+    removed: list[discord.ForumTag]
+    renamed: list[discord.ForumTag]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.renamed)
+
+
+def get_tag_diff(before: Sequence[discord.ForumTag], after: Sequence[discord.ForumTag]) -> TagDiff:
+    before_map = {tag.id: tag for tag in before}
+    after_map = {tag.id: tag for tag in after}
+
+    return TagDiff(
+        added=[tag for tag_id, tag in after_map.items() if tag_id not in before_map],
+        removed=[tag for tag_id, tag in before_map.items() if tag_id not in after_map],
+        renamed=[
+            tag
+            for tag_id, tag in after_map.items()
+            if tag_id in before_map and get_tag_name(before_map[tag_id]) != get_tag_name(tag)
+        ],
+    )
+
+
+def get_card_hash(name: str, description: str, list_id: str, label_ids: Sequence[str]) -> str:
+    """Hash the card fields a sync writes, used to skip updating cards that haven't changed."""
+    return hash_content(json.dumps([name, description, list_id, sorted(label_ids)]))
+
+
+def get_thread_activity(thread: discord.Thread, updated_at: datetime.datetime | None = None) -> int:
+    """Snowflake of a thread's latest known activity, used to sync active threads first.
+
+    Args:
+        thread: The thread.
+        updated_at: When an edit last changed the cached starter message, the starter message
+            itself is rarely cached so its edits are mostly only known from there.
+    """
+    activity = thread.last_message_id or thread.id
+    # Archiving, locking and unarchiving all move the archive timestamp
+    activity = max(activity, discord.utils.time_snowflake(thread.archive_timestamp))
+    starter = thread.starter_message
+    if starter is not None and starter.edited_at is not None:
+        activity = max(activity, discord.utils.time_snowflake(starter.edited_at))
+    if updated_at is not None:
+        activity = max(activity, discord.utils.time_snowflake(updated_at))
+    return activity
+
+
+@dataclasses.dataclass(slots=True)
+class SyncBudget:
+    """Limits after which a sync stops, the remaining changes are left for the next sync.
+
+    Threads are synced most recently active first, so what runs out is the dormant tail.
+    """
+
+    seconds: float | None = None
+    operations: int | None = None
+    """Maximum number of executed operations, roughly the number of Trello requests."""
+
+    _started_at: float | None = None
+    _spent: int = 0
+
+    def start(self) -> None:
+        """Start the clock, called once the sync holds its lock so waiting for it is free."""
+        self._started_at = time.monotonic()
+
+    @property
+    def exhausted(self) -> bool:
+        if (
+            self.seconds is not None
+            and self._started_at is not None
+            and time.monotonic() - self._started_at >= self.seconds
+        ):
+            return True
+        return self.operations is not None and self._spent >= self.operations
+
+    def spend(self) -> None:
+        self._spent += 1
+
+
+@dataclasses.dataclass(slots=True)
+class SyncResult:
+    succeeded: int = 0
+    failed: int = 0
+    deferred: int = 0
+    """Operations left for the next sync because the budget ran out."""
+    deferred_threads: int = 0
+    """Threads left unplanned for the next sync because the budget ran out."""
+
+
+class SyncDiscordToTrello:
+    """Sync a guild's linked forums to Trello.
+
+    A sync is split into planning, which only reads from Trello, and executing the plan.
+    """
+
+    def __init__(
+        self,
+        bot: Distrello,
+        guild: discord.Guild,
+        *,
+        remove_extra: bool,
+        budget: SyncBudget | None = None,
+    ) -> None:
+        self.bot = bot
+        self.guild = guild
+        self.remove_extra = remove_extra
+        self.budget = budget or SyncBudget()
+
+        self._label_maps: dict[int, dict[int, str]] = {}
+        """Tag ID to label ID maps by forum ID, loaded when executing card operations."""
+        self._board_labels: dict[str, list[TrelloLabel]] = {}
+        """Labels by board ID, forums usually share a board so each board is read once per sync."""
+        self._write_caches = True
+        """Whether planning caches starter messages and attachments, off for dry runs."""
+        self._deferred_threads = 0
+        """Threads skipped by planning because the budget ran out."""
+        self._outbox_thread_ids: set[int] | None = None
+        """Threads with writes waiting in the outbox, loaded once per sync."""
+
+    async def _create_label_and_link(
+        self, server: ServerBoardLink, forum: ForumListLink, tag: discord.ForumTag
+    ) -> None:
+        try:
+            async with server.trello as api:
+                label = await api.create_label(
+                    trello.TrelloLabelCreate(
+                        name=get_tag_name(tag),
+                        color=trello.get_random_label_color(),
+                        board_id=forum.board_id,
+                    )
+                )
+        except Exception:
+            logger.exception(f"Error creating label for {tag=}")
+            return
+
+        await self.bot.db.upsert_tag(forum_id=forum.id, tag_id=tag.id, label_id=label.id)
+
+    async def _get_board_labels(self, server: ServerBoardLink, board_id: str) -> list[TrelloLabel]:
+        labels = self._board_labels.get(board_id)
+        if labels is None:
+            labels = self._board_labels[board_id] = await get_board_labels(
+                self.bot.session, api_token=server.api_token or "", board_id=board_id
+            )
+        return labels
+
+    async def _plan_tags(
+        self,
+        plan: SyncPlan,
+        server: ServerBoardLink,
+        forum: ForumListLink,
+        tags: Sequence[discord.ForumTag],
+    ) -> None:
+        # Tag changes are applied incrementally in on_guild_channel_update, so the full label
+        # scan is only needed when some tags were never linked or extra labels should be removed
+        db_tags = await self.bot.db.get_tags(forum.id)
+        linked_tag_ids = {tag.id for tag in db_tags}
+        if not self.remove_extra and all(tag.id in linked_tag_ids for tag in tags):
+            return
+
+        try:
+            labels = await self._get_board_labels(server, forum.board_id)
+        except Exception:
+            logger.exception(f"Error fetching labels for {forum=}")
+            return
+
+        label_map = {label.name: label.id for label in labels}
+        tag_names = {get_tag_name(tag) for tag in tags}
+
+        for tag in tags:
+            if tag.id in linked_tag_ids:
+                continue
+
+            # Is there an existing label with the same name?
+            tag_name = get_tag_name(tag)
+
+            if tag_name in label_map:
+                plan.add(
+                    LinkLabel(
+                        forum_id=forum.id,
+                        tag_id=tag.id,
+                        label_id=label_map[tag_name],
+                        name=tag_name,
+                    )
+                )
+            else:
+                plan.add(
+                    CreateLabel(
+                        forum_id=forum.id, board_id=forum.board_id, tag_id=tag.id, name=tag_name
+                    )
+                )
+
+        # Remove labels in Trello that are not in Discord
+        if not self.remove_extra:
+            return
+
+        for label in labels:
+            if label.name not in tag_names:
+                plan.add(DeleteLabel(label_id=label.id, name=label.name))
+
+    async def apply_tag_diff(
+        self, server: ServerBoardLink, forum: ForumListLink, diff: TagDiff
+    ) -> None:
+        """Apply forum tag changes to the linked Trello labels."""
+        with trello_work(TrelloWork.EVENT, self.guild.id):
+            async with forum_lock(forum.id):
+                await self._apply_tag_diff(server, forum, diff)
+
+    async def _apply_tag_diff(
+        self, server: ServerBoardLink, forum: ForumListLink, diff: TagDiff
+    ) -> None:
+        for tag in diff.added:
+            if await self.bot.db.get_tag(tag.id) is not None:
+                continue
+
+            await self._create_label_and_link(server, forum, tag)
+            logger.debug(f"Created label for added {tag.id=}")
+
+        for tag in diff.removed:
+            link = await self.bot.db.get_tag(tag.id)
+            if link is None:
+                continue
+
+            if link.label_id is not None:
+                try:
+                    async with server.trello as api:
+                        await api.delete_label(link.label_id)
+                except Exception as e:
+                    if not is_not_found(e):
+                        logger.exception(f"Error deleting label {link.label_id=} from Trello")
+                        continue
+
+            await self.bot.db.delete_tag(tag.id)
+            logger.debug(f"Deleted label {link.label_id=} for removed {tag.id=}")
+
+        for tag in diff.renamed:
+            link = await self.bot.db.get_tag(tag.id)
+            if link is None or link.label_id is None:
+                continue
+
+            try:
+                await update_label_name(
+                    self.bot.session,
+                    api_token=server.api_token or "",
+                    label_id=link.label_id,
+                    name=get_tag_name(tag),
+                )
+            except Exception:
+                logger.exception(f"Error renaming label {link.label_id=}")
+                continue
+
+            logger.debug(f"Renamed label {link.label_id=} for {tag.id=}")
+
+    async def _get_description(self, thread: discord.Thread) -> str:
+        if thread.starter_message is not None:
+            if self._write_caches:
+                # Refreshes attachment URLs, Discord's CDN URLs expire
+                await self.bot.db.upsert_attachments(
+                    get_attachment_links(thread.id, thread.starter_message)
+                )
+            return render_description(thread.starter_message)
+
+        cached = await self.bot.db.get_starter_message(thread.id)
+        if cached is not None:
+            return cached.content
+
+        try:
+            message = await thread.fetch_message(thread.id)
+        except discord.NotFound:
+            return ""
+
+        description = render_description(message)
+        if self._write_caches:
+            await self.bot.db.set_starter_message(
+                thread_id=thread.id, forum_id=thread.parent_id, content=description
+            )
+            await self.bot.db.upsert_attachments(get_attachment_links(thread.id, message))
+        return description
+
+    async def _plan_attachments(self, plan: SyncPlan, card_ids: dict[int, str]) -> None:
+        """Plan uploads of attachments that aren't on their threads' cards yet."""
+        if not card_ids:
+            return
+
+        pending: dict[int, list[int]] = {}
+        for attachment in await self.bot.db.get_pending_attachments(list(card_ids)):
+            pending.setdefault(attachment.thread_id, []).append(attachment.id)
+
+        # card_ids is in activity order, keep to it
+        for thread_id, card_id in card_ids.items():
+            if thread_id in pending:
+                plan.add(
+                    MirrorAttachments(
+                        thread_id=thread_id,
+                        card_id=card_id,
+                        attachment_ids=tuple(pending[thread_id]),
+                    )
+                )
+
+    async def _plan_threads(
+        self,
+        plan: SyncPlan,
+        server: ServerBoardLink,
+        forum: ForumListLink,
+        threads: Sequence[discord.Thread],
+    ) -> None:
+        card_ids: dict[int, str] = {}
+        """Card IDs of threads that are already linked, by thread ID."""
+
+        db_tags = await self.bot.db.get_tags(forum.id)
+        completed_tag_ids = {tag.id for tag in db_tags if tag.is_completed_tag}
+
+        # Threads with changes still waiting to reach Trello go first, then the most active ones
+        pending = await self._get_pending_thread_ids([thread.id for thread in threads])
+        updates = await self.bot.db.get_starter_message_updates(forum.id)
+        threads = sorted(
+            threads,
+            key=lambda t: (t.id in pending, get_thread_activity(t, updates.get(t.id))),
+            reverse=True,
+        )
+
+        # Planning may fetch starter messages, so it can run out of budget too
+        for index, thread in enumerate(threads):
+            if self.budget.exhausted:
+                self._deferred_threads += len(threads) - index
+                break
+
+            db_thread = await self.bot.db.get_thread(thread.id)
+            if db_thread is not None and db_thread.is_dead:
+                continue
+
+            tag_ids = tuple(tag.id for tag in thread.applied_tags)
+            description = await self._get_description(thread)
+
+            list_id = forum.list_id
+            if server.completed_list_id is not None and is_thread_completed(
+                thread, completed_tag_ids
+            ):
+                list_id = server.completed_list_id
+
+            if db_thread is None:
+                plan.add(
+                    CreateCard(
+                        forum_id=forum.id,
+                        list_id=list_id,
+                        thread_id=thread.id,
+                        name=thread.name,
+                        description=description,
+                        tag_ids=tag_ids,
+                    )
+                )
+            else:
+                card_ids[thread.id] = db_thread.card_id
+
+                # The starter message shares its ID with the thread, so it's never a reply
+                cursor = db_thread.last_synced_message_id or thread.id
+                if thread.last_message_id is not None and thread.last_message_id > cursor:
+                    plan.add(
+                        MirrorComments(thread_id=thread.id, card_id=db_thread.card_id, after=cursor)
+                    )
+
+                label_ids = await self._get_label_ids(forum.id, tag_ids)
+                card_hash = get_card_hash(thread.name, description, list_id, label_ids)
+                if card_hash == db_thread.synced_hash:
+                    continue
+
+                plan.add(
+                    UpdateCard(
+                        forum_id=forum.id,
+                        list_id=list_id,
+                        thread_id=thread.id,
+                        card_id=db_thread.card_id,
+                        name=thread.name,
+                        description=description,
+                        tag_ids=tag_ids,
+                    )
+                )
+
+        await self._plan_attachments(plan, card_ids)
+
+    async def _register_webhook(self, server: ServerBoardLink) -> None:
+        """Register the board's webhook, so changes made on Trello trigger a sync."""
+        if CONFIG.trello_api_secret is None or server.board_id is None or server.webhook_id:
+            return
+
+        try:
+            server.webhook_id = await register_board_webhook(
+                self.bot.session,
+                api_token=server.api_token or "",
+                board_id=server.board_id,
+                callback_url=CONFIG.webhook_url,
+            )
+        except Exception:
+            # The next sync tries again
+            logger.exception(f"Error registering the webhook of board {server.board_id!r}")
+            return
+
+        await self.bot.db.update_server(server)
+        logger.info(f"Registered webhook {server.webhook_id!r} of board {server.board_id!r}")
+
+    async def _plan_repoint(
+        self, plan: SyncPlan, server: ServerBoardLink, forums: Sequence[ForumListLink]
+    ) -> None:
+        """Plan re-pointing forums whose lists were moved to the server's current board.
+
+        The forums are re-pointed in memory right away, so the rest of the plan uses the board.
+        """
+        board_id = server.board_id
+        stale = [forum for forum in forums if board_id is not None and forum.board_id != board_id]
+        if board_id is None or not stale:
+            return
+
+        try:
+            lists = await get_board_lists(
+                self.bot.session, api_token=server.api_token or "", board_id=board_id
+            )
+        except Exception:
+            logger.exception(f"Error fetching lists for {board_id=}")
+            return
+
+        list_ids = {list_.id for list_ in lists}
+        moved = [forum for forum in stale if forum.list_id in list_ids]
+        if not moved:
+            return
+
+        plan.add(RepointForums(forum_ids=tuple(forum.id for forum in moved), board_id=board_id))
+        for forum in moved:
+            forum.board_id = board_id
+
+    async def _plan_forum(
+        self, plan: SyncPlan, server: ServerBoardLink, forum: ForumListLink
+    ) -> None:
+        guild = self.guild
+
+        try:
+            channel = guild.get_channel(forum.id) or await guild.fetch_channel(forum.id)
+        except (discord.NotFound, discord.Forbidden):
+            logger.warning(f"Channel {forum.id} not found in guild {guild.id}")
+            return
+
+        if not isinstance(channel, discord.ForumChannel):
+            logger.warning(f"Channel {forum.id} is not a forum channel")
+            return
+
+        tags = channel.available_tags
+        if tags:
+            await self._plan_tags(plan, server, forum, tags)
+
+        await self._plan_threads(plan, server, forum, channel.threads)
+
+    async def _get_pending_thread_ids(self, thread_ids: Sequence[int]) -> set[int]:
+        """Get the threads with writes waiting in the outbox or attachments waiting for upload."""
+        if self._outbox_thread_ids is None:
+            operations = [
+                load_operation(item.operation, item.payload)
+                for item in await self.bot.db.get_outbox_items(self.guild.id)
+            ]
+            self._outbox_thread_ids = {
+                operation.thread_id
+                for operation in operations
+                if isinstance(
+                    operation, CreateCard | UpdateCard | MirrorAttachments | MirrorComments
+                )
+            }
+
+        attachments = await self.bot.db.get_pending_attachments(thread_ids)
+        return self._outbox_thread_ids | {attachment.thread_id for attachment in attachments}
+
+    def _sort_forums(self, forums: Sequence[ForumListLink]) -> list[ForumListLink]:
+        """Sort forums by their latest post, so forums with new threads are synced first."""
+
+        def get_activity(forum: ForumListLink) -> int:
+            channel = self.guild.get_channel(forum.id)
+            if isinstance(channel, discord.ForumChannel):
+                return channel.last_message_id or 0
+            return 0
+
+        return sorted(forums, key=get_activity, reverse=True)
+
+    def _count_threads(self, forums: Sequence[ForumListLink]) -> int:
+        """Count the cached threads of forums, which are the threads a sync would plan."""
+        count = 0
+        for forum in forums:
+            channel = self.guild.get_channel(forum.id)
+            if isinstance(channel, discord.ForumChannel):
+                count += len(channel.threads)
+        return count
+
+    async def _get_server(self) -> ServerBoardLink:
+        server = await self.bot.db.get_server(self.guild.id)
+        if server is None or server.api_token is None:
+            raise AccountNotLinkedError
+
+        breaker = get_breaker(server.api_token)
+        breaker.load_needs_reauth(needs_reauth=server.needs_reauth)
+        breaker.raise_if_open()
+        return server
+
+    async def plan(self) -> SyncPlan:
+        """Build the Trello operations needed to sync the guild, without writing to Trello."""
+        with trello_work(TrelloWork.BULK, self.guild.id):
+            async with guild_lock(self.guild.id):
+                server = await self._get_server()
+                forums = await self.bot.db.get_forums(self.guild.id)
+
+                plan = SyncPlan()
+                self._write_caches = False
+                try:
+                    await self._plan_repoint(plan, server, forums)
+                    for forum in forums:
+                        if get_breaker(server.api_token or "").is_open:
+                            break
+                        await self._plan_forum(plan, server, forum)
+                finally:
+                    self._write_caches = True
+                return plan
+
+    async def _get_label_ids(self, forum_id: int, tag_ids: Sequence[int]) -> list[str]:
+        label_map = self._label_maps.get(forum_id)
+        if label_map is None:
+            db_tags = await self.bot.db.get_tags(forum_id)
+            label_map = {tag.id: tag.label_id for tag in db_tags if tag.label_id is not None}
+            self._label_maps[forum_id] = label_map
+
+        return [label_map[tag_id] for tag_id in tag_ids if tag_id in label_map]
+
+    async def _post_comment(
+        self, server: ServerBoardLink, card_id: str, message: discord.Message
+    ) -> None:
+        try:
+            await add_card_comment(
+                self.bot.session,
+                api_token=server.api_token or "",
+                card_id=card_id,
+                text=render_comment(message),
+            )
+        except Exception as e:
+            if not is_rejected(e):
+                raise
+            # Skip it, otherwise one bad reply blocks the rest of the thread for good
+            logger.warning(f"Trello rejected reply {message.id=} as a comment: {e}")
+
+    async def _mirror_comments(self, server: ServerBoardLink, operation: MirrorComments) -> bool:
+        """Post a bounded batch of replies after the cursor, advancing it as they're posted."""
+        thread = self.guild.get_thread(operation.thread_id)
+        if thread is None:
+            try:
+                thread = await self.guild.fetch_channel(operation.thread_id)
+            except (discord.NotFound, discord.Forbidden):
+                return False
+            if not isinstance(thread, discord.Thread):
+                return False
+
+        cursor = operation.after
+        try:
+            async for message in thread.history(
+                limit=COMMENT_BATCH_SIZE, after=discord.Object(cursor), oldest_first=True
+            ):
+                # Skip the bot's own messages so comments mirrored from Trello don't echo back
+                if message.type in REPLY_TYPES and message.author != self.bot.user:
+                    await self._post_comment(server, operation.card_id, message)
+                cursor = message.id
+        except discord.HTTPException:
+            logger.exception(f"Error fetching replies of {operation.thread_id=}")
+            return False
+        except Exception as e:
+            if is_not_found(e):
+                await self.bot.db.mark_thread_dead(operation.thread_id)
+                logger.info(f"Card {operation.card_id=} was deleted, marked link as dead")
+            else:
+                logger.exception(f"Error mirroring replies of {operation.thread_id=}")
+            return False
+        finally:
+            if cursor != operation.after:
+                await self.bot.db.set_thread_cursor(operation.thread_id, cursor)
+
+        return True
+
+    async def _execute_operation(  # noqa: C901, PLR0911, PLR0912, PLR0915
+        self, server: ServerBoardLink, operation: Operation
+    ) -> bool:
+        """Execute a single operation, returns whether it succeeded."""
+        match operation:
+            case RepointForums():
+                await self.bot.db.move_forums(operation.forum_ids, operation.board_id)
+                logger.debug(f"Re-pointed {operation.forum_ids=} to {operation.board_id=}")
+
+            case CreateLabel():
+                # The tag may have been linked since the plan was built
+                if await self.bot.db.get_tag(operation.tag_id) is not None:
+                    return True
+
+                try:
+                    async with server.trello as api:
+                        label = await api.create_label(
+                            trello.TrelloLabelCreate(
+                                name=operation.name,
+                                color=trello.get_random_label_color(),
+                                board_id=operation.board_id,
+                            )
+                        )
+                except Exception:
+                    logger.exception(f"Error creating label for {operation=}")
+                    return False
+
+                await self.bot.db.upsert_tag(
+                    forum_id=operation.forum_id, tag_id=operation.tag_id, label_id=label.id
+                )
+                self._label_maps.pop(operation.forum_id, None)
+                self._board_labels.pop(operation.board_id, None)
+
+            case LinkLabel():
+                if await self.bot.db.get_tag(operation.tag_id) is not None:
+                    return True
+
+                await self.bot.db.upsert_tag(
+                    forum_id=operation.forum_id,
+                    tag_id=operation.tag_id,
+                    label_id=operation.label_id,
+                )
+                self._label_maps.pop(operation.forum_id, None)
+
+            case DeleteLabel():
+                try:
+                    async with server.trello as api:
+                        await api.delete_label(operation.label_id)
+                except Exception:
+                    logger.exception(f"Error deleting label {operation.label_id=} from Trello")
+                    return False
+
+                await self.bot.db.delete_tag_by_label_id(operation.label_id)
+                self._label_maps.clear()
+                self._board_labels.clear()
+
+            case CreateCard():
+                label_ids = await self._get_label_ids(operation.forum_id, operation.tag_ids)
+                try:
+                    async with server.trello as api:
+                        card = await api.create_card(
+                            trello.TrelloCardCreate(
+                                name=operation.name,
+                                description=operation.description,
+                                list_id=operation.list_id,
+                                label_ids=label_ids,
+                            )
+                        )
+                except Exception:
+                    logger.exception(f"Error creating card for {operation.thread_id=}")
+                    return False
+
+                await self.bot.db.upsert_thread(
+                    thread_id=operation.thread_id,
+                    forum_id=operation.forum_id,
+                    card_id=card.id,
+                    synced_hash=get_card_hash(
+                        operation.name, operation.description, operation.list_id, label_ids
+                    ),
+                )
+
+                # Failed uploads are retried by the next sync's MirrorAttachments
+                attachments = await self.bot.db.get_pending_attachments([operation.thread_id])
+                if attachments:
+                    await mirror_attachments(
+                        self.bot,
+                        api_token=server.api_token or "",
+                        card_id=card.id,
+                        attachments=attachments,
+                    )
+
+            case UpdateCard():
+                label_ids = await self._get_label_ids(operation.forum_id, operation.tag_ids)
+                try:
+                    async with server.trello as api:
+                        await api.update_card(
+                            trello.TrelloCardUpdate(
+                                id=operation.card_id,
+                                name=operation.name,
+                                description=operation.description,
+                                list_id=operation.list_id,
+                                label_ids=label_ids,
+                            )
+                        )
+                except Exception as e:
+                    if is_not_found(e):
+                        await self.bot.db.mark_thread_dead(operation.thread_id)
+                        logger.info(f"Card {operation.card_id=} was deleted, marked link as dead")
+                        return False
+
+                    logger.exception(f"Error updating card for {operation.thread_id=}")
+                    return False
+
+                await self.bot.db.set_thread_synced_hash(
+                    operation.thread_id,
+                    get_card_hash(
+                        operation.name, operation.description, operation.list_id, label_ids
+                    ),
+                )
+
+            case MirrorComments():
+                return await self._mirror_comments(server, operation)
+
+            case MirrorAttachments():
+                # Some may have been uploaded since the plan was built
+                attachments = await self.bot.db.get_pending_attachments([operation.thread_id])
+                return await mirror_attachments(
+                    self.bot,
+                    api_token=server.api_token or "",
+                    card_id=operation.card_id,
+                    attachments=attachments,
+                )
+
+        return True
+
+    async def _execute_operations(
+        self, server: ServerBoardLink, operations: Sequence[Operation], result: SyncResult
+    ) -> None:
+        breaker = get_breaker(server.api_token or "")
+        failed: list[Operation] = []
+        succeeded: list[str] = []
+
+        for index, operation in enumerate(operations):
+            # Stop early instead of logging a short-circuited failure per remaining operation
+            if breaker.is_open:
+                result.failed += len(operations) - index
+                break
+
+            if self.budget.exhausted:
+                result.deferred += len(operations) - index
+                break
+
+            self.budget.spend()
+            if await self._execute_operation(server, operation):
+                result.succeeded += 1
+                succeeded.append(get_operation_key(operation))
+            else:
+                result.failed += 1
+                failed.append(operation)
+
+        # Failed writes are retried from the outbox, successful ones supersede queued retries
+        await self.bot.db.delete_outbox_items(succeeded)
+        await self.bot.db.upsert_outbox_items(
+            [make_outbox_item(self.guild.id, operation) for operation in failed]
+        )
+
+    async def retry_operation(self, server: ServerBoardLink, operation: Operation) -> bool:
+        """Execute an operation from the outbox, returns whether it succeeded or became moot."""
+        match operation:
+            case CreateCard():
+                if await self.bot.db.get_thread(operation.thread_id) is not None:
+                    return True
+            case UpdateCard() | MirrorAttachments() | MirrorComments():
+                db_thread = await self.bot.db.get_thread(operation.thread_id)
+                if db_thread is None or db_thread.is_dead:
+                    return True
+                if isinstance(operation, MirrorComments):
+                    # A failed attempt may have advanced the cursor, resume from where it stopped
+                    cursor = db_thread.last_synced_message_id or db_thread.id
+                    operation = dataclasses.replace(operation, after=cursor)
+            case _:
+                pass
+
+        return await self._execute_operation(server, operation)
+
+    async def execute(self, plan: SyncPlan) -> SyncResult:
+        """Execute a plan built by plan(), operations that fail are logged and skipped."""
+        result = SyncResult()
+
+        with trello_work(TrelloWork.BULK, self.guild.id):
+            async with guild_lock(self.guild.id):
+                server = await self._get_server()
+                await self._execute_operations(server, plan.operations, result)
+
+        return result
+
+    async def sync(self) -> tuple[SyncPlan, SyncResult]:
+        """Plan and execute the sync forum by forum, each under its forum lock."""
+        full_plan = SyncPlan()
+        result = SyncResult()
+
+        with trello_work(TrelloWork.BULK, self.guild.id):
+            async with guild_lock(self.guild.id):
+                self.budget.start()
+                server = await self._get_server()
+                await self._register_webhook(server)
+
+                forums = await self.bot.db.get_forums(self.guild.id)
+                await self._plan_repoint(full_plan, server, forums)
+                await self._execute_operations(server, full_plan.operations, result)
+
+                forums = self._sort_forums(forums)
+                self._deferred_threads = 0
+                for index, forum in enumerate(forums):
+                    if get_breaker(server.api_token or "").is_open:
+                        break
+                    if self.budget.exhausted:
+                        logger.info(f"Sync budget of guild {self.guild.id} ran out at {forum.id=}")
+                        self._deferred_threads += self._count_threads(forums[index:])
+                        break
+
+                    async with forum_lock(forum.id):
+                        plan = SyncPlan()
+                        await self._plan_forum(plan, server, forum)
+                        await self._execute_operations(server, plan.operations, result)
+
+                    full_plan.operations.extend(plan.operations)
+
+                result.deferred_threads = self._deferred_threads
+
+        return full_plan, result
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import datetime
+
+from distrello.db.models import OutboxItem
+from distrello.sync.plan import Operation, dump_operation, get_operation_key
+
+BASE_DELAY = 30.0
+"""Seconds before the first retry of a failed write, doubled after every failed retry."""
+MAX_DELAY = 60 * 60.0
+"""Longest wait between retries."""
+MAX_ATTEMPTS = 8
+"""Attempts, including the original write, before a write is moved to the dead letters."""
+
+
+def get_retry_at(attempts: int, now: datetime.datetime) -> datetime.datetime:
+    """When to retry a write that failed the given number of times, backing off exponentially."""
+    delay = min(BASE_DELAY * 2 ** (attempts - 1), MAX_DELAY)
+    return now + datetime.timedelta(seconds=delay)
+
+
+def make_outbox_item(guild_id: int, operation: Operation) -> OutboxItem:
+    """Queue an operation whose first attempt just failed."""
+    now = datetime.datetime.now(datetime.UTC)
+    return OutboxItem(
+        id=get_operation_key(operation),
+        guild_id=guild_id,
+        operation=type(operation).__name__,
+        payload=dump_operation(operation),
+        attempts=1,
+        next_attempt_at=get_retry_at(1, now),
+    )
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import collections
+import dataclasses
+import json
+from typing import Any, ClassVar
+
+from distrello.utils.embeds import DefaultEmbed
+
+SAMPLE_SIZE = 3
+"""Number of example operations shown per kind in a plan summary."""
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class CreateLabel:
+    kind: ClassVar[str] = "Create label"
+
+    forum_id: int
+    board_id: str
+    tag_id: int
+    name: str
+
+    def describe(self) -> str:
+        return f"Create label **{self.name}**"
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class LinkLabel:
+    """Link a tag to an existing label with the same name, doesn't write to Trello."""
+
+    kind: ClassVar[str] = "Link existing label"
+
+    forum_id: int
+    tag_id: int
+    label_id: str
+    name: str
+
+    def describe(self) -> str:
+        return f"Link tag to existing label **{self.name}**"
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class RepointForums:
+    """Point forums at the board their lists were moved to, doesn't write to Trello."""
+
+    kind: ClassVar[str] = "Re-point forums"
+
+    forum_ids: tuple[int, ...]
+    board_id: str
+
+    def describe(self) -> str:
+        return ", ".join(f"<#{forum_id}>" for forum_id in self.forum_ids)
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class DeleteLabel:
+    kind: ClassVar[str] = "Delete label"
+
+    label_id: str
+    name: str
+
+    def describe(self) -> str:
+        return f"Delete label **{self.name or 'Unnamed label'}**"
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class CreateCard:
+    kind: ClassVar[str] = "Create card"
+
+    forum_id: int
+    list_id: str
+    thread_id: int
+    name: str
+    description: str
+    tag_ids: tuple[int, ...]
+    """Label IDs are resolved from these when executing, labels may be created by the same plan."""
+
+    def describe(self) -> str:
+        return f"Create card for <#{self.thread_id}>"
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class UpdateCard:
+    kind: ClassVar[str] = "Update card"
+
+    forum_id: int
+    list_id: str
+    thread_id: int
+    card_id: str
+    name: str
+    description: str
+    tag_ids: tuple[int, ...]
+
+    def describe(self) -> str:
+        return f"Update card for <#{self.thread_id}>"
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class MirrorAttachments:
+    kind: ClassVar[str] = "Upload attachments"
+
+    thread_id: int
+    card_id: str
+    attachment_ids: tuple[int, ...]
+
+    def describe(self) -> str:
+        return f"Upload {len(self.attachment_ids)} attachments to card for <#{self.thread_id}>"
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class MirrorComments:
+    """Post thread replies newer than the thread's cursor as card comments."""
+
+    kind: ClassVar[str] = "Mirror replies"
+
+    thread_id: int
+    card_id: str
+    after: int
+    """ID of the last mirrored reply, or the thread ID if none were mirrored yet."""
+
+    def describe(self) -> str:
+        return f"Mirror new replies to card for <#{self.thread_id}>"
+
+
+type Operation = (
+    RepointForums
+    | CreateLabel
+    | LinkLabel
+    | DeleteLabel
+    | CreateCard
+    | UpdateCard
+    | MirrorAttachments
+    | MirrorComments
+)
+
+OPERATION_TYPES: dict[str, type[Operation]] = {
+    cls.__name__: cls
+    for cls in (
+        RepointForums,
+        CreateLabel,
+        LinkLabel,
+        DeleteLabel,
+        CreateCard,
+        UpdateCard,
+        MirrorAttachments,
+        MirrorComments,
+    )
+}
+
+
+def get_operation_key(operation: Operation) -> str:
+    """Key of what an operation writes to, a newer operation with the same key supersedes it."""
+    match operation:
+        case RepointForums():
+            target = operation.board_id
+        case CreateLabel() | LinkLabel():
+            target = operation.tag_id
+        case DeleteLabel():
+            target = operation.label_id
+        case CreateCard() | UpdateCard() | MirrorAttachments() | MirrorComments():
+            target = operation.thread_id
+    return f"{type(operation).__name__}:{target}"
+
+
+def dump_operation(operation: Operation) -> str:
+    return json.dumps(dataclasses.asdict(operation))
+
+
+def load_operation(name: str, payload: str) -> Operation:
+    # JSON has no tuples, the only sequences in operations
+    fields: dict[str, Any] = {
+        key: tuple(value) if isinstance(value, list) else value
+        for key, value in json.loads(payload).items()
+    }
+    return OPERATION_TYPES[name](**fields)
+
+
+@dataclasses.dataclass(slots=True)
+class SyncPlan:
+    """Trello operations a sync intends to make, built using read calls only."""
+
+    operations: list[Operation] = dataclasses.field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    def add(self, operation: Operation) -> None:
+        self.operations.append(operation)
+
+    def count(self) -> collections.Counter[str]:
+        return collections.Counter(operation.kind for operation in self.operations)
+
+    def get_embed(self, *, title: str) -> DefaultEmbed:
+        embed = DefaultEmbed(title=title)
+        if not self.operations:
+            embed.description = "Everything is already in sync."
+            return embed
+
+        samples: dict[str, list[str]] = collections.defaultdict(list)
+        for operation in self.operations:
+            if len(samples[operation.kind]) < SAMPLE_SIZE:
+                samples[operation.kind].append(operation.describe())
+
+        for kind, count in self.count().items():
+            value = "\n".join(f"* {sample}" for sample in samples[kind])
+            if count > SAMPLE_SIZE:
+                value += f"\n* ...and {count - SAMPLE_SIZE} more"
+            embed.add_field(name=f"{kind} ({count})", value=value, inline=False)
+
+        return embed
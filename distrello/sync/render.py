@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import collections
+import datetime
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import discord
+
+DESCRIPTION_LIMIT = 16384
+"""Maximum length of a Trello card description."""
+COMMENT_LIMIT = 16384
+"""Maximum length of a Trello card comment."""
+CACHE_SIZE = 1024
+"""Number of rendered descriptions kept in memory."""
+
+USER_MENTION = re.compile(r"<@!?(\d+)>")
+ROLE_MENTION = re.compile(r"<@&(\d+)>")
+CHANNEL_MENTION = re.compile(r"<#(\d+)>")
+CUSTOM_EMOJI = re.compile(r"<a?:(\w+):\d+>")
+TIMESTAMP = re.compile(r"<t:(-?\d+)(?::[tTdDfFR])?>")
+SPOILER = re.compile(r"\|\|(.+?)\|\|", re.DOTALL)
+UNDERLINE = re.compile(r"(?<!_)__(?!_)(.+?)(?<!_)__(?!_)", re.DOTALL)
+"""Discord's underline, which is bold in Trello, Trello has no underline so the markers are dropped."""
+SUBTEXT = re.compile(r"^-# ", re.MULTILINE)
+CODE = re.compile(r"(```.*?```|`[^`]+`)", re.DOTALL)
+"""Code blocks and inline code, which both platforms show verbatim."""
+
+type RenderKey = tuple[int, str, tuple[tuple[str | None, ...], ...], tuple[int, ...]]
+
+_rendered: collections.OrderedDict[RenderKey, str] = collections.OrderedDict()
+
+
+def render_content(content: str, guild: discord.Guild | None) -> str:
+    """Convert Discord markdown to Trello markdown, resolving mentions from the guild cache."""
+
+    def user(match: re.Match[str]) -> str:
+        member = guild.get_member(int(match[1])) if guild is not None else None
+        return f"@{member.display_name}" if member is not None else "@unknown-user"
+
+    def role(match: re.Match[str]) -> str:
+        role = guild.get_role(int(match[1])) if guild is not None else None
+        return f"@{role.name}" if role is not None else "@unknown-role"
+
+    def channel(match: re.Match[str]) -> str:
+        channel = guild.get_channel_or_thread(int(match[1])) if guild is not None else None
+        return f"#{channel.name}" if channel is not None else "#unknown-channel"
+
+    def timestamp(match: re.Match[str]) -> str:
+        dt = datetime.datetime.fromtimestamp(int(match[1]), tz=datetime.UTC)
+        return dt.strftime("%Y-%m-%d %H:%M UTC")
+
+    def subtext(match: re.Match[str], *, first: bool) -> str:
+        # Text after a code span starts mid-line, so only its first part can be a line start
+        return "" if first or match.start() > 0 else match[0]
+
+    def convert(text: str, *, first: bool) -> str:
+        text = USER_MENTION.sub(user, text)
+        text = ROLE_MENTION.sub(role, text)
+        text = CHANNEL_MENTION.sub(channel, text)
+        text = CUSTOM_EMOJI.sub(r":\1:", text)
+        text = TIMESTAMP.sub(timestamp, text)
+        text = SPOILER.sub(r"\1", text)
+        text = UNDERLINE.sub(r"\1", text)
+        return SUBTEXT.sub(lambda m: subtext(m, first=first), text)
+
+    # Splitting on a capturing group alternates text and code, code is kept as written
+    parts = CODE.split(content)
+    return "".join(
+        part if index % 2 else convert(part, first=index == 0) for index, part in enumerate(parts)
+    )
+
+
+def _render(message: discord.Message, *, limit: int = DESCRIPTION_LIMIT) -> str:
+    parts = [render_content(message.content, message.guild)] if message.content else []
+
+    for embed in message.embeds:
+        lines = []
+        if embed.title:
+            lines.append(f"**[{embed.title}]({embed.url})**" if embed.url else f"**{embed.title}**")
+        if embed.description:
+            lines.append(render_content(embed.description, message.guild))
+        if lines:
+            parts.append("\n".join(f"> {line}" for line in "\n".join(lines).splitlines()))
+
+    if message.attachments:
+        # Attachment URLs are signed and expire within a day, link to the message instead
+        links = "\n".join(f"* [{a.filename}]({message.jump_url})" for a in message.attachments)
+        parts.append(f"**Attachments**\n{links}")
+
+    description = "\n\n".join(parts)
+    if len(description) <= limit:
+        return description
+
+    suffix = f"…\n\n[Read the full post on Discord]({message.jump_url})"
+    return description[: limit - len(suffix)] + suffix
+
+
+def render_description(message: discord.Message) -> str:
+    """Render a forum starter message as a Trello card description.
+
+    The result is memoized by everything it's rendered from, so each version is rendered once.
+    Link previews don't change the edit timestamp, so that can't be the key.
+    """
+    key: RenderKey = (
+        message.id,
+        message.content,
+        tuple((e.title, e.url, e.description) for e in message.embeds),
+        tuple(a.id for a in message.attachments),
+    )
+    if (description := _rendered.get(key)) is not None:
+        _rendered.move_to_end(key)
+        return description
+
+    description = _rendered[key] = _render(message)
+    if len(_rendered) > CACHE_SIZE:
+        _rendered.popitem(last=False)
+    return description
+
+
+def render_comment(message: discord.Message) -> str:
+    """Render a forum thread reply as a Trello card comment, credited to its author."""
+    header = f"**{message.author.display_name}** ([reply on Discord]({message.jump_url}))\n\n"
+    return header + _render(message, limit=COMMENT_LIMIT - len(header))
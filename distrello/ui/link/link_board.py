@@ -13,13 +13,12 @@ from distrello.utils.embeds import DefaultEmbed
 if TYPE_CHECKING:
     from collections.abc import Generator, Sequence
 
-    import trello
-
+    from distrello.utils.reads import TrelloBoard
     from distrello.utils.types import Interaction
 
 
 class LinkBoardSelect(PaginatorSelect["LinkBoardView"]):
-    def __init__(self, *, boards: Sequence[trello.TrelloBoard], current: str | None) -> None:
+    def __init__(self, *, boards: Sequence[TrelloBoard], current: str | None) -> None:
         super().__init__(
             placeholder="Select a board to link",
             custom_id="link_board:board_select",
@@ -54,6 +53,9 @@ class LinkBoardSelect(PaginatorSelect["LinkBoardView"]):
             raise AccountNotLinkedError
 
         server.board_id = selected_board.id
+        server.completed_list_id = None  # Lists belong to the previous board
+        # The old board's webhook is deleted by Trello once the API answers it with 410
+        server.webhook_id = None
         await i.client.db.update_server(server)
 
         embed = DefaultEmbed(
@@ -64,7 +66,7 @@ class LinkBoardSelect(PaginatorSelect["LinkBoardView"]):
 
 
 class LinkBoardView(PaginatorView):
-    def __init__(self, boards: Sequence[trello.TrelloBoard], current: str | None) -> None:
+    def __init__(self, boards: Sequence[TrelloBoard], current: str | None) -> None:
         self.boards = boards
         self.current = current
 
@@ -72,14 +74,12 @@ class LinkBoardView(PaginatorView):
         self._add_board_select()
 
     @property
-    def current_board(self) -> trello.TrelloBoard | None:
+    def current_board(self) -> TrelloBoard | None:
         if self.current is None:
             return None
         return next((board for board in self.boards if board.id == self.current), None)
 
-    def _get_embeds(
-        self, boards: Sequence[trello.TrelloBoard]
-    ) -> Generator[DefaultEmbed, None, None]:
+    def _get_embeds(self, boards: Sequence[TrelloBoard]) -> Generator[DefaultEmbed, None, None]:
         batched_boards = itertools.batched(boards, 10)
         for page, batch in enumerate(batched_boards, start=1):
             description = "\n".join(f"* [{board.name}]({board.url})" for board in batch)
@@ -114,7 +114,7 @@ class LinkBoardView(PaginatorView):
 
 
 class LinkBoardConfirmView(View):
-    def __init__(self, boards: Sequence[trello.TrelloBoard], current: str | None) -> None:
+    def __init__(self, boards: Sequence[TrelloBoard], current: str | None) -> None:
         self.boards = boards
         self.current = current
 
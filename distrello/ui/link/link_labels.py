@@ -7,20 +7,18 @@ import discord
 from distrello.errors import InvalidInputError
 from distrello.ui.components import PaginatorSelect, View
 from distrello.utils.embeds import DefaultEmbed
+from distrello.utils.locks import forum_lock
 
 if TYPE_CHECKING:
     from collections.abc import Sequence
 
-    import trello
-
     from distrello.db.models import TagLabelLink
+    from distrello.utils.reads import TrelloLabel
     from distrello.utils.types import Interaction
 
 
 class LabelSelect(PaginatorSelect["LinkLabelsView"]):
-    def __init__(
-        self, labels: list[trello.TrelloLabel], tag_id: int, db_tag: TagLabelLink | None
-    ) -> None:
+    def __init__(self, labels: list[TrelloLabel], tag_id: int, db_tag: TagLabelLink | None) -> None:
         super().__init__(
             placeholder="Select a label to link",
             custom_id="link_label:label_select",
@@ -50,24 +48,22 @@ class LabelSelect(PaginatorSelect["LinkLabelsView"]):
             return
 
         label = None if self.values[0] == "none" else self.view.get_label(self.values[0])
-        db_tag = self.view.get_db_tag(self.tag_id)
 
-        if db_tag is None:
-            db_tag = await i.client.db.create_tag(
+        # A sync may hold the forum lock for a while, so acknowledge the interaction first
+        await i.response.defer()
+
+        async with forum_lock(self.view.forum_id):
+            await i.client.db.upsert_tag(
                 forum_id=self.view.forum_id,
                 tag_id=self.tag_id,
                 label_id=None if label is None else label.id,
             )
-
-        db_tag.label_id = None if label is None else label.id
-        await i.client.db.update_tag(db_tag)
-
-        self.view.db_tags = await i.client.db.get_tags(self.view.forum_id)
+            self.view.db_tags = await i.client.db.get_tags(self.view.forum_id)
 
         embed = self.view.get_embed()
         self.view.remove_item(self)
         self.view.add_item(TagSelect(self.view.tags))
-        await i.response.edit_message(embed=embed, view=self.view)
+        await i.edit_original_response(embed=embed, view=self.view)
 
 
 class TagSelect(PaginatorSelect["LinkLabelsView"]):
@@ -102,7 +98,7 @@ class LinkLabelsView(View):
         self,
         *,
         forum_id: int,
-        labels: list[trello.TrelloLabel],
+        labels: list[TrelloLabel],
         tags: Sequence[discord.ForumTag],
         db_tags: Sequence[TagLabelLink],
     ) -> None:
@@ -114,7 +110,7 @@ class LinkLabelsView(View):
 
         self.add_item(TagSelect(tags))
 
-    def get_label(self, label_id: str) -> trello.TrelloLabel | None:
+    def get_label(self, label_id: str) -> TrelloLabel | None:
         return next((label for label in self.labels if label.id == label_id), None)
 
     def get_tag(self, tag_id: int) -> discord.ForumTag | None:
@@ -9,17 +9,17 @@ from discord import ui
 from distrello.errors import AccountNotLinkedError, BoardNotLinkedError, BotError
 from distrello.ui.components import PaginatorSelect, PaginatorView
 from distrello.utils.embeds import DefaultEmbed
+from distrello.utils.locks import forum_lock
 
 if TYPE_CHECKING:
     from collections.abc import Generator, Sequence
 
-    import trello
-
+    from distrello.utils.reads import TrelloList
     from distrello.utils.types import Interaction
 
 
 class LinkListSelect(PaginatorSelect["LinkListView"]):
-    def __init__(self, *, lists: Sequence[trello.TrelloList], current: str | None) -> None:
+    def __init__(self, *, lists: Sequence[TrelloList], current: str | None) -> None:
         super().__init__(
             placeholder="Select a list to link",
             custom_id="link_list:list_select",
@@ -54,51 +54,68 @@ class LinkListSelect(PaginatorSelect["LinkListView"]):
         if server.board_id is None:
             raise BoardNotLinkedError
 
-        forum = await i.client.db.get_forum(self.view.forum_id)
-        if forum is None:
-            forum = await i.client.db.create_forum(
-                forum_id=self.view.forum_id,
-                server_id=i.guild.id,
-                board_id=server.board_id,
-                list_id=selected_list.id,
+        if self.view.forum_id is None:
+            server.completed_list_id = selected_list.id
+            await i.client.db.update_server(server)
+
+            embed = DefaultEmbed(
+                title="Completed List Linked",
+                description=f"Completed threads will be moved to **{selected_list.name}**",
             )
-        else:
-            forum.list_id = selected_list.id
-            await i.client.db.update_forum(forum)
+            await i.response.edit_message(embed=embed, view=None)
+            return
+
+        # A sync may hold the forum lock for a while, so acknowledge the interaction first
+        await i.response.defer()
+
+        async with forum_lock(self.view.forum_id):
+            forum = await i.client.db.get_forum(self.view.forum_id)
+            if forum is None:
+                forum = await i.client.db.create_forum(
+                    forum_id=self.view.forum_id,
+                    server_id=i.guild.id,
+                    board_id=server.board_id,
+                    list_id=selected_list.id,
+                )
+            else:
+                forum.list_id = selected_list.id
+                await i.client.db.update_forum(forum)
 
         embed = DefaultEmbed(
             title="List Linked",
             description=f"Successfully linked <#{self.view.forum_id}> to **{selected_list.name}**",
         )
-        await i.response.edit_message(embed=embed, view=None)
+        await i.edit_original_response(embed=embed, view=None)
 
 
 class LinkListView(PaginatorView):
     def __init__(
-        self, lists: Sequence[trello.TrelloList], forum_id: int, current: str | None
+        self, lists: Sequence[TrelloList], forum_id: int | None, current: str | None
     ) -> None:
         self.lists = lists
         self.forum_id = forum_id
+        """Discord forum ID, None when picking the server's completed list."""
         self.current = current
 
         super().__init__(list(self._get_embeds(lists)))
         self._add_list_select()
 
     @property
-    def current_list(self) -> trello.TrelloList | None:
+    def current_list(self) -> TrelloList | None:
         if self.current is None:
             return None
         return next((list_ for list_ in self.lists if list_.id == self.current), None)
 
-    def _get_embeds(
-        self, lists: Sequence[trello.TrelloList]
-    ) -> Generator[DefaultEmbed, None, None]:
+    def _get_embeds(self, lists: Sequence[TrelloList]) -> Generator[DefaultEmbed, None, None]:
         batched_lists = itertools.batched(lists, 10)
         for page, batch in enumerate(batched_lists, start=1):
             description = "\n".join(f"* {list_.name}" for list_ in batch)
-            embed = DefaultEmbed(
-                title=f"Link Discord Forum to Trello List (Page {page})", description=description
+            title = (
+                "Link Discord Forum to Trello List"
+                if self.forum_id is not None
+                else "Link Completed Cards to Trello List"
             )
+            embed = DefaultEmbed(title=f"{title} (Page {page})", description=description)
             embed.set_footer(
                 text=f"Currently linked to: {self.current_list.name if self.current_list else 'None'}"
             )
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import enum
+import functools
+import inspect
+import time
+from typing import TYPE_CHECKING, Any, cast
+
+from loguru import logger
+
+from distrello.db.orm import Database
+from distrello.errors import TrelloReauthRequiredError, TrelloUnavailableError
+from distrello.utils.misc import hash_content
+from distrello.utils.scheduler import scheduler
+from distrello.utils.trello import get_error_status
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    import trello
+
+FAILURE_THRESHOLD = 5
+"""Consecutive 5xx responses that open a token's circuit."""
+OPEN_DURATION = 60.0
+"""Seconds a circuit opened by 5xx responses stays open before a probe is let through."""
+AUTH_OPEN_DURATION = 30 * 60.0
+"""Seconds a circuit opened by a rejected token stays open before a probe is let through."""
+PROBE_TIMEOUT = 30.0
+"""Seconds a probe call may take before it counts as failed."""
+
+
+class CircuitState(enum.Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    """A single probe call is in flight, its outcome closes or re-opens the circuit."""
+
+
+class CircuitBreaker:
+    """Stop calling Trello with a token that keeps failing.
+
+    A 401 opens the circuit right away, FAILURE_THRESHOLD consecutive 5xx responses open it
+    too. While open, calls fail fast without reaching Trello, once the open duration passes a
+    single probe call is let through to test whether the token recovered.
+    """
+
+    def __init__(self, api_token: str) -> None:
+        self.api_token = api_token
+        self.state = CircuitState.CLOSED
+        self.auth_failed = False
+        """Whether the circuit was opened because Trello rejected the token."""
+
+        self._failures = 0
+        self._opened_at = 0.0
+        self._stored_state_loaded = False
+
+    @property
+    def _key(self) -> str:
+        # Never log the token itself
+        return hash_content(self.api_token)
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls would currently be short-circuited."""
+        if self.state is CircuitState.HALF_OPEN:
+            return True
+        if self.state is CircuitState.OPEN:
+            duration = AUTH_OPEN_DURATION if self.auth_failed else OPEN_DURATION
+            return time.monotonic() - self._opened_at < duration
+        return False
+
+    def raise_if_open(self) -> None:
+        """Fail fast before starting work that would only make short-circuited calls.
+
+        Raises:
+            TrelloReauthRequiredError: If the circuit is open because the token was rejected.
+            TrelloUnavailableError: If the circuit is open because of server errors.
+        """
+        if self.is_open:
+            raise TrelloReauthRequiredError if self.auth_failed else TrelloUnavailableError
+
+    def load_needs_reauth(self, *, needs_reauth: bool) -> None:
+        """Open the circuit for a token stored as rejected, e.g. after a restart.
+
+        Only the first load before any call counts, after that the circuit's own state is newer.
+        """
+        if self._stored_state_loaded:
+            return
+        self._stored_state_loaded = True
+
+        if needs_reauth and self.state is CircuitState.CLOSED:
+            self._open(auth_failed=True)
+
+    def _before_call(self) -> None:
+        if self.state is CircuitState.CLOSED:
+            return
+
+        self.raise_if_open()
+
+        self.state = CircuitState.HALF_OPEN
+        logger.info(f"Probing Trello circuit {self._key}")
+
+    def _open(self, *, auth_failed: bool) -> None:
+        self.state = CircuitState.OPEN
+        self.auth_failed = auth_failed
+        self._opened_at = time.monotonic()
+        reason = "token was rejected" if auth_failed else f"{self._failures} server errors"
+        logger.warning(f"Opened Trello circuit {self._key}, {reason}")
+
+    async def _on_success(self) -> None:
+        if self.state is not CircuitState.CLOSED:
+            logger.info(f"Closed Trello circuit {self._key}")
+        if self.auth_failed:
+            await _set_needs_reauth(self.api_token, needs_reauth=False)
+
+        self.state = CircuitState.CLOSED
+        self.auth_failed = False
+        self._failures = 0
+
+    async def _on_failure(self, e: Exception) -> None:
+        status = get_error_status(e)
+        if status == 401:
+            if not self.auth_failed:
+                await _set_needs_reauth(self.api_token, needs_reauth=True)
+            self._open(auth_failed=True)
+            return
+
+        if status is not None and status >= 500:
+            self._failures += 1
+            if self.state is CircuitState.HALF_OPEN or self._failures >= FAILURE_THRESHOLD:
+                self._open(auth_failed=False)
+            return
+
+        if self.state is not CircuitState.HALF_OPEN:
+            return
+        if status is None:
+            # Network errors and timeouts don't show whether Trello recovered
+            self._open(auth_failed=self.auth_failed)
+        else:
+            # Any other response still proves Trello answered, so a probe counts as recovered
+            await self._on_success()
+
+    async def record_failure(self, e: Exception) -> None:
+        """Count a failure Trello reported inside a successful response, e.g. in a batch read."""
+        await self._on_failure(e)
+
+    async def call[T](self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """Call Trello through the circuit, every Trello call goes through here.
+
+        Raises:
+            TrelloReauthRequiredError: If the circuit is open because the token was rejected.
+            TrelloUnavailableError: If the circuit is open because of server errors.
+        """
+        self._before_call()
+        self._stored_state_loaded = True
+        probing = self.state is CircuitState.HALF_OPEN
+        try:
+            # Short-circuited calls never queue, so they don't take turns from working tokens
+            await scheduler.wait()
+            async with asyncio.timeout(PROBE_TIMEOUT if probing else None):
+                result = await func(*args, **kwargs)
+        except Exception as e:
+            await self._on_failure(e)
+            raise
+        except BaseException:
+            # A cancelled probe proved nothing, the next call probes again
+            if self.state is CircuitState.HALF_OPEN:
+                self.state = CircuitState.OPEN
+            raise
+
+        await self._on_success()
+        return result
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(api_token: str) -> CircuitBreaker:
+    breaker = _breakers.get(api_token)
+    if breaker is None:
+        breaker = _breakers[api_token] = CircuitBreaker(api_token)
+    return breaker
+
+
+async def _set_needs_reauth(api_token: str, *, needs_reauth: bool) -> None:
+    try:
+        await Database().set_needs_reauth(api_token, needs_reauth=needs_reauth)
+    except Exception:
+        logger.exception("Error updating needs_reauth")
+
+
+class GuardedTrelloAPI:
+    """TrelloAPI wrapper that sends every API call through the token's circuit breaker."""
+
+    def __init__(self, api: trello.TrelloAPI, breaker: CircuitBreaker) -> None:
+        self._api = api
+        self._breaker = breaker
+
+    async def __aenter__(self) -> trello.TrelloAPI:
+        await self._api.__aenter__()
+        # Call sites keep TrelloAPI's types, the wrapper forwards everything to it
+        return cast("trello.TrelloAPI", self)
+
+    async def __aexit__(self, *args: object) -> None:
+        await self._api.__aexit__(*args)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._api, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def guarded(*args: Any, **kwargs: Any) -> Any:
+            return await self._breaker.call(attr, *args, **kwargs)
+
+        return guarded
@@ -8,8 +8,41 @@ from pydantic_settings import BaseSettings
 class Config(BaseSettings):
     db_url: str = "sqlite+aiosqlite:///./distrello.db"
     trello_api_key: str
+    trello_api_secret: str | None = None
+    """Trello API secret that signs webhook requests, webhooks are only used when it's set."""
     discord_bot_token: str
+    trello_rate_limit: float = 25.0
+    """Trello requests per second across all clusters, Trello allows 300 per 10s per API key."""
     env: Literal["dev", "prod"] = "dev"
+    debug_extensions: bool = False
+    """Whether to load debug extensions like jishaku in prod."""
+    task_timing: bool = False
+    """Whether to time every step of every task to find ones blocking the loop, adds overhead."""
+
+    api_mode: Literal["embedded", "standalone"] = "embedded"
+    """Whether the OAuth/webhook server runs inside the bot process or on its own."""
+    api_host: str = "localhost"
+    api_port: int = 6721
+    api_workers: int = 1
+    """Number of standalone OAuth/webhook server processes sharing the port."""
+
+    cluster_count: int = 1
+    """Number of worker processes to split the gateway shards across."""
+    shard_count: int | None = None
+    """Total number of shards, None to use the count recommended by Discord."""
+    ipc_port: int = 6730
+    """Port of cluster 0's IPC server, cluster N listens on ipc_port + N."""
+
+    @property
+    def public_url(self) -> str:
+        """URL Trello and browsers reach the OAuth/webhook server at."""
+        if self.env == "dev":
+            return f"http://localhost:{self.api_port}"
+        return "https://distrello.seria.moe"
+
+    @property
+    def webhook_url(self) -> str:
+        return f"{self.public_url}/webhook"
 
 
 CONFIG = Config()  # pyright: ignore[reportCallIssue]
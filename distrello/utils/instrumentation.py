@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import collections.abc
+import dataclasses
+import itertools
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+
+from distrello.utils.config import CONFIG
+
+if TYPE_CHECKING:
+    from types import FrameType
+
+SLOW_STEP_THRESHOLD = 0.1
+"""Seconds a single task step may block the loop before it's logged, only with task timing."""
+LAG_INTERVAL = 1.0
+"""Seconds between event loop heartbeats."""
+LAG_THRESHOLD = 0.25
+"""Seconds a heartbeat may be late before the lag is logged."""
+STALL_THRESHOLD = 2.0
+"""Seconds without a heartbeat before the blocked loop's stack is logged."""
+TOP_TASKS = 5
+"""Number of most common live tasks included in lag reports."""
+
+_ASYNCIO_DIR = str(Path(asyncio.__file__).parent)
+
+
+@dataclasses.dataclass(slots=True)
+class TaskInfo:
+    coro_name: str
+    """Name of the task's coroutine, used while the task only has a default name."""
+    created_at: str
+    """First frame outside asyncio when the task was created."""
+    started_at: float = dataclasses.field(default_factory=time.monotonic)
+    run_time: float = 0.0
+    """Seconds spent running the task's steps, only recorded with task timing."""
+    steps: int = 0
+
+
+_tasks: dict[asyncio.Future[Any], TaskInfo] = {}
+"""Live tasks, also keeps references to them so they aren't garbage collected mid-run."""
+
+
+def _get_creation_site() -> str:
+    frame: FrameType | None = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename.startswith(_ASYNCIO_DIR):
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    return f"{frame.f_code.co_qualname} ({frame.f_code.co_filename}:{frame.f_lineno})"
+
+
+def _get_task_name(task: asyncio.Future[Any] | None, info: TaskInfo) -> str:
+    # Names passed to create_task are set after the factory runs, so look them up late
+    if isinstance(task, asyncio.Task) and not task.get_name().startswith("Task-"):
+        return task.get_name()
+    return info.coro_name
+
+
+def _record_step(info: TaskInfo, duration: float) -> None:
+    info.run_time += duration
+    info.steps += 1
+    if duration >= SLOW_STEP_THRESHOLD:
+        name = _get_task_name(asyncio.current_task(), info)
+        logger.warning(
+            f"Task {name!r} created at {info.created_at} blocked the loop for {duration:.3f}s"
+        )
+
+
+class _TimedCoroutine(collections.abc.Coroutine[Any, Any, Any]):
+    """Coroutine wrapper timing each step the task runs, i.e. each time the loop resumes it."""
+
+    __slots__ = ("_coro", "_info")
+
+    def __init__(self, coro: collections.abc.Coroutine[Any, Any, Any], info: TaskInfo) -> None:
+        self._coro = coro
+        self._info = info
+
+    def send(self, value: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self._coro.send(value)
+        finally:
+            _record_step(self._info, time.perf_counter() - start)
+
+    def throw(self, *args: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self._coro.throw(*args)
+        finally:
+            _record_step(self._info, time.perf_counter() - start)
+
+    def close(self) -> None:
+        self._coro.close()
+
+    # Expose the wrapped coroutine's state so await chains can be walked, see utils.profiler
+    @property
+    def cr_frame(self) -> FrameType | None:
+        return getattr(self._coro, "cr_frame", None)
+
+    @property
+    def cr_await(self) -> Any:
+        return getattr(self._coro, "cr_await", None)
+
+    def __await__(self) -> Any:
+        return self._coro.__await__()
+
+
+def _on_task_done(task: asyncio.Future[Any]) -> None:
+    info = _tasks.pop(task, None)
+    if info is not None and info.run_time >= SLOW_STEP_THRESHOLD:
+        logger.debug(
+            f"Task {_get_task_name(task, info)!r} ran for {info.run_time:.3f}s in {info.steps} steps over "
+            f"{time.monotonic() - info.started_at:.3f}s"
+        )
+
+
+def wrap_task_factory() -> None:
+    """Keep references to every task and record where it came from.
+
+    With CONFIG.task_timing, every step of every task is also timed, which logs the task
+    behind any step that blocks the loop for SLOW_STEP_THRESHOLD or longer.
+    """
+    loop = asyncio.get_running_loop()
+    original_factory = loop.get_task_factory()
+
+    def new_factory(
+        loop: asyncio.AbstractEventLoop, coro: asyncio._CoroutineLike[Any], **kwargs: Any
+    ) -> asyncio.Task[Any] | asyncio.Future[Any]:
+        info = TaskInfo(
+            coro_name=getattr(coro, "__qualname__", type(coro).__name__),
+            created_at=_get_creation_site(),
+        )
+        if CONFIG.task_timing:
+            coro = _TimedCoroutine(coro, info)
+
+        if original_factory is not None:
+            t = original_factory(loop, coro, **kwargs)
+        else:
+            t = asyncio.Task(coro, loop=loop, **kwargs)
+        _tasks[t] = info
+        t.add_done_callback(_on_task_done)
+        return t
+
+    loop.set_task_factory(new_factory)
+
+
+def get_task_counts() -> collections.Counter[str]:
+    """Count live tasks by name."""
+    return collections.Counter(itertools.starmap(_get_task_name, _tasks.items()))
+
+
+def _format_top_tasks() -> str:
+    return ", ".join(f"{name} x{count}" for name, count in get_task_counts().most_common(TOP_TASKS))
+
+
+class LoopMonitor:
+    """Measure event loop lag with a heartbeat, and find out what's blocking a stalled loop.
+
+    The heartbeat only notices lag after the loop recovers. A watchdog thread checks the
+    heartbeat too, and when it stops it logs the stack the loop's thread is stuck in.
+    """
+
+    def __init__(self) -> None:
+        self.lag = 0.0
+        """Lag of the latest heartbeat in seconds."""
+
+        self._last_beat = time.monotonic()
+        self._loop_thread_id = threading.get_ident()
+        self._task: asyncio.Task[None] | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-monitor")
+        threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(LAG_INTERVAL)
+            self._last_beat = time.monotonic()
+            self.lag = self._last_beat - start - LAG_INTERVAL
+
+            if self.lag >= LAG_THRESHOLD:
+                logger.warning(
+                    f"Event loop lagged {self.lag:.3f}s with {len(_tasks)} live tasks, "
+                    f"most common: {_format_top_tasks()}"
+                )
+
+    def _watchdog(self) -> None:
+        reported_beat = 0.0
+        while not self._stop.wait(LAG_INTERVAL / 2):
+            beat = self._last_beat
+            stalled = time.monotonic() - beat - LAG_INTERVAL
+            if stalled < STALL_THRESHOLD or beat == reported_beat:
+                continue
+
+            # Report each stall once
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "unknown"
+            logger.warning(f"Event loop blocked for {stalled:.1f}s, it's running:\n{stack}")
+
+
+def start_loop_monitor() -> LoopMonitor:
+    monitor = LoopMonitor()
+    monitor.start()
+    return monitor
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import weakref
+from typing import TYPE_CHECKING
+
+from sqlalchemy import NullPool, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from distrello.db.session import engine
+from distrello.utils.config import CONFIG
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
+
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+_locks: weakref.WeakValueDictionary[int, asyncio.Lock] = weakref.WeakValueDictionary()
+
+
+def _use_advisory_locks() -> bool:
+    # Clusters share the database, so they also need to serialize through it
+    return CONFIG.cluster_count > 1 and engine.dialect.name == "postgresql"
+
+
+@functools.cache
+def _get_lock_engine() -> AsyncEngine:
+    # Lock connections aren't pooled, so they don't starve queries and closing one always
+    # ends its session on the server
+    return create_async_engine(CONFIG.db_url, poolclass=NullPool)
+
+
+@contextlib.asynccontextmanager
+async def _lock(key: int) -> AsyncGenerator[None, None]:
+    lock = _locks.get(key)
+    if lock is None:
+        lock = _locks[key] = asyncio.Lock()
+
+    async with lock:
+        if not _use_advisory_locks():
+            yield
+            return
+
+        conn = await _get_lock_engine().connect()
+        try:
+            # Transaction-level locks are released when the transaction or the connection ends,
+            # so there's no unlock that can be skipped
+            await conn.begin()
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": key})
+            yield
+        finally:
+            await asyncio.shield(conn.close())
+
+
+def guild_lock(guild_id: int) -> contextlib.AbstractAsyncContextManager[None]:
+    """Lock held for a whole sync of a guild, so only one sync runs per guild at a time."""
+    return _lock(guild_id)
+
+
+def is_guild_locked(guild_id: int) -> bool:
+    """Whether this process holds or is waiting for a guild's lock."""
+    lock = _locks.get(guild_id)
+    return lock is not None and lock.locked()
+
+
+def forum_lock(forum_id: int) -> contextlib.AbstractAsyncContextManager[None]:
+    """Lock held while a forum's links or its Trello labels and cards are being changed.
+
+    When both are needed, acquire the guild lock first.
+    """
+    # Snowflakes are unique across guilds and channels, so the IDs can share one key space
+    return _lock(forum_id)
@@ -1,24 +1,8 @@
 from __future__ import annotations
 
-import asyncio
-from typing import Any
+import hashlib
 
-_tasks_set = set()
 
-
-def wrap_task_factory() -> None:
-    loop = asyncio.get_running_loop()
-    original_factory = loop.get_task_factory()
-
-    def new_factory(
-        loop: asyncio.AbstractEventLoop, coro: asyncio._CoroutineLike[Any], **kwargs: Any
-    ) -> asyncio.Task[Any] | asyncio.Future[Any]:
-        if original_factory is not None:
-            t = original_factory(loop, coro, **kwargs)
-        else:
-            t = asyncio.Task(coro, loop=loop, **kwargs)
-        _tasks_set.add(t)
-        t.add_done_callback(_tasks_set.discard)
-        return t
-
-    loop.set_task_factory(new_factory)
+def hash_content(content: str) -> str:
+    """Get a short hash of message content, used to tell if the content changed."""
+    return hashlib.blake2b(content.encode(), digest_size=8).hexdigest()
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import dataclasses
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Self
+
+if TYPE_CHECKING:
+    from types import FrameType, TracebackType
+
+SAMPLE_INTERVAL = 0.005
+"""Seconds between samples of what the event loop's thread is running."""
+TASK_SAMPLE_INTERVAL = 0.05
+"""Seconds between samples of where tasks are awaiting, sampled on the loop so kept coarser."""
+TOP_COUNT = 25
+"""Number of functions listed in each section of the report."""
+IDLE = "<idle>"
+"""Stack recorded when the loop is waiting for I/O with nothing to run."""
+
+_ASYNCIO_DIR = str(Path(asyncio.__file__).parent)
+
+type Stacks = collections.Counter[tuple[str, ...]]
+
+
+def _get_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def _get_loop_stack(frame: FrameType) -> tuple[str, ...]:
+    frames: list[FrameType] = []
+    current: FrameType | None = frame
+    while current is not None:
+        frames.append(current)
+        current = current.f_back
+    frames.reverse()
+
+    # Everything up to the loop's iteration is the same in every sample, start at the callback
+    for index in range(len(frames) - 1, -1, -1):
+        if frames[index].f_code.co_qualname == "BaseEventLoop._run_once":
+            frames = frames[index + 1 :]
+            if frames and frames[0].f_code.co_qualname.endswith("select"):
+                return (IDLE,)
+            break
+    while frames and frames[0].f_code.co_filename.startswith(_ASYNCIO_DIR):
+        frames.pop(0)
+
+    return tuple(_get_label(f) for f in frames) or (IDLE,)
+
+
+def _get_await_stack(task: asyncio.Task[Any]) -> tuple[str, ...]:
+    labels: list[str] = []
+    coro: Any = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        labels.append(_get_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return tuple(labels)
+
+
+def _get_top(stacks: Stacks, count: int, *, by_total: bool) -> list[tuple[str, int, int]]:
+    own: collections.Counter[str] = collections.Counter()
+    total: collections.Counter[str] = collections.Counter()
+    for stack, samples in stacks.items():
+        own[stack[-1]] += samples
+        # Count recursive functions once per sample
+        for label in set(stack):
+            total[label] += samples
+    top = total if by_total else own
+    return [(label, own[label], total[label]) for label, _ in top.most_common(count)]
+
+
+def dump_collapsed(stacks: Stacks) -> str:
+    """Dump stacks in the collapsed format read by flamegraph.pl, speedscope and similar."""
+    return "\n".join(f"{';'.join(stack)} {samples}" for stack, samples in stacks.items())
+
+
+@dataclasses.dataclass(slots=True)
+class Profile:
+    duration: float
+    loop_stacks: Stacks
+    """What the loop's thread was running, including waiting for I/O as IDLE."""
+    task_stacks: Stacks
+    """Where suspended tasks were awaiting."""
+
+    @property
+    def busy(self) -> float:
+        """Share of loop samples that weren't idle."""
+        samples = self.loop_stacks.total()
+        if not samples:
+            return 0.0
+        return 1 - self.loop_stacks[IDLE,] / samples
+
+    @staticmethod
+    def _format_top(title: str, stacks: Stacks, count: int, *, by_total: bool) -> list[str]:
+        samples = stacks.total() or 1
+        lines = [title, f"{'own %':>7} {'total %':>7}  function"]
+        lines.extend(
+            f"{own / samples:>7.1%} {total / samples:>7.1%}  {label}"
+            for label, own, total in _get_top(stacks, count, by_total=by_total)
+        )
+        return lines
+
+    def get_report(self, count: int = TOP_COUNT) -> str:
+        """Get the functions with the most samples as text."""
+        lines = [
+            f"Profiled {self.duration:.1f}s, loop busy {self.busy:.1%}",
+            f"Loop samples: {self.loop_stacks.total()}, task samples: {self.task_stacks.total()}",
+            "",
+            *self._format_top(
+                "Running on the loop (CPU, blocks other tasks):",
+                self.loop_stacks,
+                count,
+                by_total=False,
+            ),
+            "",
+            *self._format_top(
+                # Awaits end in asyncio primitives, their callers tell more
+                "Awaited by tasks (waiting on I/O, locks, the scheduler):",
+                self.task_stacks,
+                count,
+                by_total=True,
+            ),
+        ]
+        return "\n".join(lines)
+
+
+class SamplingProfiler:
+    """Sample the running event loop without tracing every call, cheap enough for production.
+
+    A thread samples the stack the loop's thread is running, which shows where CPU time goes.
+    A task on the loop samples the await chain of every suspended task, which shows where
+    coroutines spend their time waiting. Both are written as collapsed stacks for flame graphs.
+
+    Args:
+        new_tasks_only: Only sample tasks created while profiling, e.g. when profiling one
+            operation started inside the profiler instead of the whole bot.
+    """
+
+    def __init__(self, *, new_tasks_only: bool = False) -> None:
+        self.new_tasks_only = new_tasks_only
+
+        self._loop_stacks: Stacks = collections.Counter()
+        self._task_stacks: Stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._ignored: set[asyncio.Task[Any]] = set()
+        self._started_at = 0.0
+        self._profile: Profile | None = None
+
+    @property
+    def profile(self) -> Profile:
+        if self._profile is None:
+            msg = "The profiler hasn't finished yet"
+            raise RuntimeError(msg)
+        return self._profile
+
+    def _sample_loop(self, thread_id: int) -> None:
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self._loop_stacks[_get_loop_stack(frame)] += 1
+
+    async def _sample_tasks(self) -> None:
+        current = asyncio.current_task()
+        while True:
+            await asyncio.sleep(TASK_SAMPLE_INTERVAL)
+            for task in asyncio.all_tasks():
+                if task is current or task in self._ignored:
+                    continue
+                stack = _get_await_stack(task)
+                if stack:
+                    self._task_stacks[stack] += 1
+
+    async def __aenter__(self) -> Self:
+        self._started_at = time.monotonic()
+        if self.new_tasks_only:
+            self._ignored = asyncio.all_tasks()
+        self._thread = threading.Thread(
+            target=self._sample_loop, args=(threading.get_ident(),), name="profiler", daemon=True
+        )
+        self._thread.start()
+        self._task = asyncio.create_task(self._sample_tasks(), name="profiler")
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+
+        self._profile = Profile(
+            duration=time.monotonic() - self._started_at,
+            loop_stacks=self._loop_stacks,
+            task_stacks=self._task_stacks,
+        )
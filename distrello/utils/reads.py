@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import itertools
+import urllib.parse
+from typing import TYPE_CHECKING, Any
+
+from distrello.utils.breaker import get_breaker
+from distrello.utils.trello import request
+
+if TYPE_CHECKING:
+    import aiohttp
+
+BATCH_WINDOW = 0.005
+"""Seconds to wait for more reads before sending them, reads in this window share a request."""
+BATCH_LIMIT = 10
+"""Maximum number of URLs Trello accepts in one batch request."""
+
+
+# Only the fields callers use are fetched and kept, link views hold these for minutes
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class TrelloBoard:
+    id: str
+    name: str
+    url: str
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class TrelloList:
+    id: str
+    name: str
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class TrelloLabel:
+    id: str
+    name: str
+    color: str | None = None
+
+
+class TrelloBatchError(Exception):
+    """A read in a batch request failed, statuses are read like any other Trello error."""
+
+    def __init__(self, status: int | None, message: str) -> None:
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+@dataclasses.dataclass(slots=True)
+class _PendingRead:
+    path: str
+    params: dict[str, str]
+    future: asyncio.Future[Any]
+
+
+class ReadCoalescer:
+    """Group a token's GET requests made within BATCH_WINDOW into Trello's batch endpoint.
+
+    Identical reads share one result, so concurrent callers asking for the same board's labels
+    cost a single URL in the batch.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, api_token: str) -> None:
+        self.session = session
+        self.api_token = api_token
+
+        self._pending: dict[str, _PendingRead] = {}
+        self._flush_task: asyncio.Task[None] | None = None
+        """Task sending the batch that's still collecting reads."""
+        self._in_flight: set[asyncio.Task[None]] = set()
+
+    async def get(self, path: str, params: dict[str, str] | None = None) -> Any:
+        params = params or {}
+        url = f"{path}?{urllib.parse.urlencode(params)}" if params else path
+
+        pending = self._pending.get(url)
+        if pending is None:
+            future = asyncio.get_running_loop().create_future()
+            pending = self._pending[url] = _PendingRead(path, params, future)
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_later())
+                self._in_flight.add(self._flush_task)
+                self._flush_task.add_done_callback(self._in_flight.discard)
+
+        # A cancelled caller mustn't cancel the read for the others sharing it
+        return await asyncio.shield(pending.future)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(BATCH_WINDOW)
+
+        # No awaits in between, so reads made from now on start a new batch
+        self._flush_task = None
+        pending, self._pending = self._pending, {}
+
+        await asyncio.gather(
+            *(self._fetch(dict(chunk)) for chunk in itertools.batched(pending.items(), BATCH_LIMIT))
+        )
+
+    async def _fetch(self, reads: dict[str, _PendingRead]) -> None:
+        if len(reads) == 1:
+            (read,) = reads.values()
+            try:
+                read.future.set_result(
+                    await request(
+                        self.session, "GET", read.path, api_token=self.api_token, params=read.params
+                    )
+                )
+            except Exception as e:
+                read.future.set_exception(e)
+            return
+
+        # Commas separate the URLs, so commas inside them (e.g. in fields) must stay encoded
+        urls = ",".join(url.replace(",", "%2C") for url in reads)
+        try:
+            results = await request(
+                self.session, "GET", "/batch", api_token=self.api_token, params={"urls": urls}
+            )
+        except Exception as e:
+            for read in reads.values():
+                read.future.set_exception(e)
+            return
+
+        breaker = get_breaker(self.api_token)
+        for read, result in zip(reads.values(), results, strict=True):
+            if "200" in result:
+                read.future.set_result(result["200"])
+                continue
+
+            error = TrelloBatchError(result.get("statusCode"), result.get("message", ""))
+            read.future.set_exception(error)
+            # The batch request itself succeeded, so the breaker hasn't seen this read fail
+            await breaker.record_failure(error)
+
+
+_coalescers: dict[str, ReadCoalescer] = {}
+
+
+def get_reader(session: aiohttp.ClientSession, api_token: str) -> ReadCoalescer:
+    reader = _coalescers.get(api_token)
+    if reader is None:
+        reader = _coalescers[api_token] = ReadCoalescer(session, api_token)
+    return reader
+
+
+async def get_boards(session: aiohttp.ClientSession, *, api_token: str) -> list[TrelloBoard]:
+    """Get the open boards of the token's member."""
+    boards = await get_reader(session, api_token).get(
+        "/members/me/boards", {"fields": "id,name,url", "filter": "open"}
+    )
+    return [TrelloBoard(id=board["id"], name=board["name"], url=board["url"]) for board in boards]
+
+
+async def get_board_lists(
+    session: aiohttp.ClientSession, *, api_token: str, board_id: str
+) -> list[TrelloList]:
+    """Get the open lists of a board."""
+    lists = await get_reader(session, api_token).get(
+        f"/boards/{board_id}/lists", {"fields": "id,name", "filter": "open"}
+    )
+    return [TrelloList(id=list_["id"], name=list_["name"]) for list_ in lists]
+
+
+async def get_board_labels(
+    session: aiohttp.ClientSession, *, api_token: str, board_id: str, with_color: bool = False
+) -> list[TrelloLabel]:
+    """Get the labels of a board, colors are only fetched when asked for."""
+    fields = "id,name,color" if with_color else "id,name"
+    # Trello returns 50 labels unless asked for more, 1000 is the most it allows
+    labels = await get_reader(session, api_token).get(
+        f"/boards/{board_id}/labels", {"fields": fields, "limit": "1000"}
+    )
+    return [
+        TrelloLabel(id=label["id"], name=label["name"], color=label.get("color"))
+        for label in labels
+    ]
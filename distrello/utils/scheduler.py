@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import dataclasses
+import enum
+import heapq
+import itertools
+import time
+from typing import TYPE_CHECKING
+
+from distrello.utils.config import CONFIG
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+BURST = 10
+"""Requests that can be sent at once after the scheduler was idle."""
+
+
+class TrelloWork(enum.Enum):
+    """Kinds of Trello work, the value is the share of the request rate each gets under load."""
+
+    INTERACTIVE = 8
+    """Slash commands a user is waiting on."""
+    EVENT = 4
+    """Reactions to Discord and Trello events, e.g. moving a card when a thread is closed."""
+    BULK = 1
+    """Syncs, imports and outbox retries."""
+
+
+@dataclasses.dataclass(slots=True, frozen=True)
+class _WorkContext:
+    work: TrelloWork
+    guild_id: int
+
+
+_UNCLASSIFIED = _WorkContext(TrelloWork.EVENT, 0)
+"""Calls made outside any classified work, e.g. from event listeners."""
+_context: contextvars.ContextVar[_WorkContext] = contextvars.ContextVar(
+    "trello_work", default=_UNCLASSIFIED
+)
+
+
+def set_trello_work(work: TrelloWork, guild_id: int) -> None:
+    """Classify the Trello calls made by the current task from now on."""
+    _context.set(_WorkContext(work, guild_id))
+
+
+@contextlib.contextmanager
+def trello_work(work: TrelloWork, guild_id: int) -> Generator[None, None, None]:
+    """Classify the Trello calls made inside the block, including by tasks it creates."""
+    token = _context.set(_WorkContext(work, guild_id))
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class TrelloScheduler:
+    """Weighted fair queue in front of every Trello call, see start-time fair queuing.
+
+    Each guild's calls of each kind form a flow. A call gets a finish tag that grows by
+    1 / weight with every call its flow has queued, calls are sent in finish tag order at
+    a rate that keeps the bot under Trello's per-key limit. A guild running a large sync
+    only pushes its own flow's tags up, so other guilds' calls and interactive commands
+    overtake it, while the sync still gets all the capacity nobody else uses.
+    """
+
+    def __init__(self, rate: float, *, burst: int = BURST) -> None:
+        self.rate = rate
+        self.burst = burst
+
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._virtual_time = 0.0
+        self._finish_tags: dict[_WorkContext, float] = {}
+        """Finish tag of the last call queued by each flow."""
+        self._queue: list[tuple[float, int, float, asyncio.Future[None]]] = []
+        """Queued calls as (finish tag, arrival order, start tag, waiter)."""
+        self._counter = itertools.count()
+        self._dispatcher: asyncio.Task[None] | None = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    async def wait(self) -> None:
+        """Wait for the current task's turn to call Trello."""
+        flow = _context.get()
+        start = max(self._virtual_time, self._finish_tags.get(flow, 0.0))
+        finish = start + 1 / flow.work.value
+        self._finish_tags[flow] = finish
+
+        self._refill()
+        if not self._queue and self._tokens >= 1:
+            self._tokens -= 1
+            self._virtual_time = start
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (finish, next(self._counter), start, waiter))
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await waiter
+
+    async def _dispatch(self) -> None:
+        try:
+            while self._queue:
+                self._refill()
+                if self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+                    continue
+
+                _, _, start, waiter = heapq.heappop(self._queue)
+                if waiter.done():  # The caller was cancelled
+                    continue
+
+                self._tokens -= 1
+                self._virtual_time = start
+                waiter.set_result(None)
+        finally:
+            self._dispatcher = None
+            # Flows that are idle can't be behind anymore, forget them
+            self._finish_tags = {
+                flow: tag for flow, tag in self._finish_tags.items() if tag > self._virtual_time
+            }
+
+
+# Every cluster gets an equal share of the key's rate limit
+scheduler = TrelloScheduler(CONFIG.trello_rate_limit / CONFIG.cluster_count)
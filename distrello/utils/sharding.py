@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import aiohttp
+
+DISCORD_GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+
+
+def get_shard_id(guild_id: int, shard_count: int) -> int:
+    """Get the ID of the shard that receives events for a guild."""
+    return (guild_id >> 22) % shard_count
+
+
+def get_cluster_id(shard_id: int, cluster_count: int) -> int:
+    """Get the ID of the cluster (worker process) that runs a shard."""
+    return shard_id % cluster_count
+
+
+def get_cluster_shard_ids(cluster_id: int, cluster_count: int, shard_count: int) -> list[int]:
+    """Get the IDs of all shards run by a cluster."""
+    return [
+        shard_id
+        for shard_id in range(shard_count)
+        if get_cluster_id(shard_id, cluster_count) == cluster_id
+    ]
+
+
+async def fetch_recommended_shard_count(token: str) -> int:
+    async with (
+        aiohttp.ClientSession() as session,
+        session.get(DISCORD_GATEWAY_BOT_URL, headers={"Authorization": f"Bot {token}"}) as resp,
+    ):
+        resp.raise_for_status()
+        data = await resp.json()
+
+    return data["shards"]
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from distrello.utils.config import CONFIG
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
+
+    import aiohttp
+
+TRELLO_API_URL = "https://api.trello.com/1"
+
+
+def get_error_status(e: Exception) -> int | None:
+    """Get the HTTP status code of a failed Trello request, if there is one."""
+    for attr in ("status", "status_code", "code"):
+        value = getattr(e, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_not_found(e: Exception) -> bool:
+    """Whether a Trello request failed because the resource no longer exists."""
+    return get_error_status(e) == 404
+
+
+def is_rejected(e: Exception) -> bool:
+    """Whether Trello rejected the request itself, so retrying it unchanged can't succeed.
+
+    Missing resources, rejected tokens and rate limits are excluded, they're about the card,
+    the token or timing rather than the request.
+    """
+    status = get_error_status(e)
+    return status is not None and 400 <= status < 500 and status not in {401, 404, 429}
+
+
+async def request(  # noqa: PLR0913
+    session: aiohttp.ClientSession,
+    method: str,
+    path: str,
+    *,
+    api_token: str,
+    params: dict[str, str] | None = None,
+    data: Any = None,
+) -> Any:
+    """Make a raw Trello REST request for endpoints trello-py doesn't wrap.
+
+    Raises:
+        aiohttp.ClientResponseError: If Trello responds with an error status.
+        TrelloReauthRequiredError: If the token's circuit is open because it was rejected.
+        TrelloUnavailableError: If the token's circuit is open because of server errors.
+    """
+    # Imported lazily, the breaker uses this module to read error statuses
+    from distrello.utils.breaker import get_breaker  # noqa: PLC0415
+
+    params = {**(params or {}), "key": CONFIG.trello_api_key, "token": api_token}
+    return await get_breaker(api_token).call(_request, session, method, path, params, data)
+
+
+async def _request(
+    session: aiohttp.ClientSession, method: str, path: str, params: dict[str, str], data: Any
+) -> Any:
+    async with session.request(method, f"{TRELLO_API_URL}{path}", params=params, data=data) as resp:
+        resp.raise_for_status()
+        return await resp.json()
+
+
+async def update_label_name(
+    session: aiohttp.ClientSession, *, api_token: str, label_id: str, name: str
+) -> None:
+    await request(session, "PUT", f"/labels/{label_id}", api_token=api_token, params={"name": name})
+
+
+async def move_card(
+    session: aiohttp.ClientSession, *, api_token: str, card_id: str, list_id: str
+) -> None:
+    await request(
+        session, "PUT", f"/cards/{card_id}", api_token=api_token, params={"idList": list_id}
+    )
+
+
+async def add_card_comment(
+    session: aiohttp.ClientSession, *, api_token: str, card_id: str, text: str
+) -> None:
+    await request(
+        session,
+        "POST",
+        f"/cards/{card_id}/actions/comments",
+        api_token=api_token,
+        # Comments can be 16 KB, too long for a query string once percent-encoded
+        data={"text": text},
+    )
+
+
+async def register_board_webhook(
+    session: aiohttp.ClientSession, *, api_token: str, board_id: str, callback_url: str
+) -> str:
+    """Register a webhook for a board's actions, reusing the token's existing one if there is one.
+
+    Returns:
+        The webhook's ID.
+    """
+    webhooks: list[dict[str, Any]] = await request(
+        session, "GET", f"/tokens/{api_token}/webhooks", api_token=api_token
+    )
+    for webhook in webhooks:
+        # Trello rejects a second webhook with the same token, model and callback
+        if webhook["idModel"] == board_id and webhook["callbackURL"] == callback_url:
+            return webhook["id"]
+
+    webhook: dict[str, Any] = await request(
+        session,
+        "POST",
+        "/webhooks",
+        api_token=api_token,
+        params={"idModel": board_id, "callbackURL": callback_url, "description": "Distrello"},
+    )
+    return webhook["id"]
+
+
+async def iter_list_cards(
+    session: aiohttp.ClientSession,
+    *,
+    api_token: str,
+    list_id: str,
+    fields: str = "id,name,desc,idLabels",
+    page_size: int = 100,
+) -> AsyncGenerator[dict[str, Any], None]:
+    """Stream the open cards of a list one page at a time, newest first."""
+    before: str | None = None
+    while True:
+        params = {"fields": fields, "limit": str(page_size)}
+        if before is not None:
+            params["before"] = before
+
+        cards: list[dict[str, Any]] = await request(
+            session, "GET", f"/lists/{list_id}/cards", api_token=api_token, params=params
+        )
+        for card in cards:
+            yield card
+
+        if len(cards) < page_size:
+            return
+        # IDs start with the creation timestamp, so the smallest one is the oldest card
+        before = min(card["id"] for card in cards)
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 import discord
 
-from distrello.bot import Distrello
+if TYPE_CHECKING:
+    from distrello.bot import Distrello
 
+# The alias value is evaluated lazily, so importing this module doesn't import the bot
 type Interaction = discord.Interaction[Distrello]
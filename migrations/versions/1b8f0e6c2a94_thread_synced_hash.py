@@ -0,0 +1,36 @@
+"""thread synced hash
+
+Revision ID: 1b8f0e6c2a94
+Revises: e72b4d9a1f36
+Create Date: 2026-10-19 10:40:00.000000
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# revision identifiers, used by Alembic.
+revision: str = "1b8f0e6c2a94"
+down_revision: str | Sequence[str] | None = "e72b4d9a1f36"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "threads", sa.Column("synced_hash", sqlmodel.sql.sqltypes.AutoString(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("threads", "synced_hash")
@@ -0,0 +1,36 @@
+"""server needs reauth
+
+Revision ID: 2f7a9d4c6b31
+Revises: 9c5e3b7d0a18
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# revision identifiers, used by Alembic.
+revision: str = "2f7a9d4c6b31"
+down_revision: str | Sequence[str] | None = "9c5e3b7d0a18"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "servers",
+        sa.Column("needs_reauth", sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("servers", "needs_reauth")
@@ -0,0 +1,70 @@
+"""baseline
+
+Revision ID: 5f0c1a2b3d4e
+Revises:
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# revision identifiers, used by Alembic.
+revision: str = "5f0c1a2b3d4e"
+down_revision: str | Sequence[str] | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "servers",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("api_token", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("board_id", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("completed_list_id", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "forums",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("board_id", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("list_id", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("server_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["server_id"], ["servers.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "tags",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("label_id", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("is_completed_tag", sa.Boolean(), nullable=False),
+        sa.Column("forum_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["forum_id"], ["forums.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "threads",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("card_id", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("forum_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["forum_id"], ["forums.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("threads")
+    op.drop_table("tags")
+    op.drop_table("forums")
+    op.drop_table("servers")
@@ -0,0 +1,36 @@
+"""server webhook id
+
+Revision ID: 626d6d588f5e
+Revises: 80413e805665
+Create Date: 2026-10-19 02:50:45.469049
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# revision identifiers, used by Alembic.
+revision: str = "626d6d588f5e"
+down_revision: str | Sequence[str] | None = "80413e805665"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "servers", sa.Column("webhook_id", sqlmodel.sql.sqltypes.AutoString(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("servers", "webhook_id")
@@ -0,0 +1,42 @@
+"""bigint foreign keys
+
+Revision ID: 80413e805665
+Revises: 6e1c8a3f5d27
+Create Date: 2026-10-19 02:49:20.032896
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# revision identifiers, used by Alembic.
+revision: str = "80413e805665"
+down_revision: str | Sequence[str] | None = "6e1c8a3f5d27"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+COLUMNS = (("forums", "server_id"), ("tags", "forum_id"), ("threads", "forum_id"))
+"""Columns holding Discord IDs that the baseline created as 32-bit integers."""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Batch mode recreates the tables on SQLite, which can't alter column types
+    for table, column in COLUMNS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.Integer(), type_=sa.BigInteger())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in COLUMNS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.BigInteger(), type_=sa.Integer())
@@ -0,0 +1,35 @@
+"""thread tombstones
+
+Revision ID: 8a1d7c4e9b20
+Revises: 5f0c1a2b3d4e
+Create Date: 2026-10-19 10:05:00.000000
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# revision identifiers, used by Alembic.
+revision: str = "8a1d7c4e9b20"
+down_revision: str | Sequence[str] | None = "5f0c1a2b3d4e"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "threads", sa.Column("is_dead", sa.Boolean(), nullable=False, server_default=sa.false())
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("threads", "is_dead")
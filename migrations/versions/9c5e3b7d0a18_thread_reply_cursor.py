@@ -0,0 +1,33 @@
+"""thread reply cursor
+
+Revision ID: 9c5e3b7d0a18
+Revises: 4d2a6f8c1e57
+Create Date: 2026-10-19 11:30:00.000000
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# revision identifiers, used by Alembic.
+revision: str = "9c5e3b7d0a18"
+down_revision: str | Sequence[str] | None = "4d2a6f8c1e57"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("threads", sa.Column("last_synced_message_id", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("threads", "last_synced_message_id")
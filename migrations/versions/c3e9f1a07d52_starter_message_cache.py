@@ -0,0 +1,41 @@
+"""starter message cache
+
+Revision ID: c3e9f1a07d52
+Revises: 8a1d7c4e9b20
+Create Date: 2026-10-19 10:10:00.000000
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# revision identifiers, used by Alembic.
+revision: str = "c3e9f1a07d52"
+down_revision: str | Sequence[str] | None = "8a1d7c4e9b20"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "starter_messages",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("forum_id", sa.BigInteger(), nullable=False),
+        sa.Column("content", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("content_hash", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("starter_messages")
@@ -0,0 +1,35 @@
+"""starter message updated at
+
+Revision ID: d6fe19ccfde4
+Revises: 626d6d588f5e
+Create Date: 2026-10-19 03:13:04.608131
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# revision identifiers, used by Alembic.
+revision: str = "d6fe19ccfde4"
+down_revision: str | Sequence[str] | None = "626d6d588f5e"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "starter_messages", sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("starter_messages", "updated_at")
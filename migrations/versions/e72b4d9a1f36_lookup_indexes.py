@@ -0,0 +1,46 @@
+"""lookup indexes
+
+Revision ID: e72b4d9a1f36
+Revises: c3e9f1a07d52
+Create Date: 2026-10-19 10:20:00.000000
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from alembic import op
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# revision identifiers, used by Alembic.
+revision: str = "e72b4d9a1f36"
+down_revision: str | Sequence[str] | None = "c3e9f1a07d52"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f("ix_servers_board_id"), "servers", ["board_id"], unique=False)
+    op.create_index(op.f("ix_forums_server_id"), "forums", ["server_id"], unique=False)
+    op.create_index(op.f("ix_tags_forum_id"), "tags", ["forum_id"], unique=False)
+    op.create_index(op.f("ix_tags_label_id"), "tags", ["label_id"], unique=False)
+    op.create_index(op.f("ix_threads_card_id"), "threads", ["card_id"], unique=True)
+    op.create_index("ix_threads_forum_id_is_dead", "threads", ["forum_id", "is_dead"], unique=False)
+    op.create_index(
+        op.f("ix_starter_messages_forum_id"), "starter_messages", ["forum_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_starter_messages_forum_id"), table_name="starter_messages")
+    op.drop_index("ix_threads_forum_id_is_dead", table_name="threads")
+    op.drop_index(op.f("ix_threads_card_id"), table_name="threads")
+    op.drop_index(op.f("ix_tags_label_id"), table_name="tags")
+    op.drop_index(op.f("ix_tags_forum_id"), table_name="tags")
+    op.drop_index(op.f("ix_forums_server_id"), table_name="forums")
+    op.drop_index(op.f("ix_servers_board_id"), table_name="servers")
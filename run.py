@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
+import multiprocessing
 
 import aiohttp
 import discord
@@ -11,9 +12,11 @@ from sqlmodel import SQLModel
 from distrello.api import TrelloOAuthCallbackHandler
 from distrello.bot import Distrello
 from distrello.db.session import engine
+from distrello.ipc import IPCServer
 from distrello.utils.config import CONFIG
+from distrello.utils.instrumentation import start_loop_monitor, wrap_task_factory
 from distrello.utils.logging import setup_logging
-from distrello.utils.misc import wrap_task_factory
+from distrello.utils.sharding import fetch_recommended_shard_count, get_cluster_shard_ids
 
 discord.VoiceClient.warn_nacl = False
 
@@ -29,18 +32,116 @@ async def create_tables() -> None:
             logger.info("Successfully created database tables")
 
 
+def get_alembic_head() -> str | None:
+    from alembic.config import Config  # noqa: PLC0415
+    from alembic.script import ScriptDirectory  # noqa: PLC0415
+
+    return ScriptDirectory.from_config(Config("alembic.ini")).get_current_head()
+
+
+async def check_schema_revision() -> None:
+    """Check the database is migrated to the latest Alembic revision, without touching it."""
+    from alembic.runtime.migration import MigrationContext  # noqa: PLC0415
+
+    async with engine.connect() as conn:
+        current = await conn.run_sync(
+            lambda sync_conn: MigrationContext.configure(sync_conn).get_current_revision()
+        )
+    head = await asyncio.to_thread(get_alembic_head)
+
+    if current != head:
+        logger.error(f"Database is at revision {current!r} but the latest is {head!r}")
+        logger.error("Run `alembic upgrade head`, database functionality may be limited")
+    else:
+        logger.info(f"Database schema is up to date at revision {head!r}")
+
+
+async def prepare_database() -> None:
+    # Prod schemas are managed by Alembic, create_all is only a dev convenience
+    if CONFIG.env == "prod":
+        await check_schema_revision()
+    else:
+        await create_tables()
+
+
+async def start_bot(
+    *, cluster_id: int = 0, shard_ids: list[int] | None = None, shard_count: int | None = None
+) -> None:
+    async with (
+        aiohttp.ClientSession() as session,
+        Distrello(
+            session, cluster_id=cluster_id, shard_ids=shard_ids, shard_count=shard_count
+        ) as bot,
+    ):
+        ipc = IPCServer(bot)
+        api = TrelloOAuthCallbackHandler(bot.db, session)
+        embed_api = cluster_id == 0 and CONFIG.api_mode == "embedded"
+
+        with contextlib.suppress(KeyboardInterrupt, asyncio.CancelledError):
+            try:
+                await ipc.start()
+                if embed_api:
+                    await api.start()
+
+                await bot.start(CONFIG.discord_bot_token)
+            finally:
+                if embed_api:
+                    await api.close()
+                await ipc.close()
+
+
 async def main() -> None:
     wrap_task_factory()
-    await create_tables()
+    start_loop_monitor()
+    await prepare_database()
+    await start_bot()
 
-    async with aiohttp.ClientSession() as session, Distrello(session) as bot:
-        with contextlib.suppress(KeyboardInterrupt, asyncio.CancelledError):
-            api = TrelloOAuthCallbackHandler()
-            asyncio.create_task(api.run())  # noqa: RUF006
 
-            await bot.start(CONFIG.discord_bot_token)
+async def cluster_main(cluster_id: int, shard_count: int) -> None:
+    wrap_task_factory()
+    start_loop_monitor()
+    shard_ids = get_cluster_shard_ids(cluster_id, CONFIG.cluster_count, shard_count)
+    logger.info(f"Starting cluster {cluster_id} with shards {shard_ids}")
+    await start_bot(cluster_id=cluster_id, shard_ids=shard_ids, shard_count=shard_count)
+
+
+def run_cluster(cluster_id: int, shard_count: int) -> None:
+    setup_logging(f"logs/cluster-{cluster_id}.log")
+    asyncio.run(cluster_main(cluster_id, shard_count))
+
+
+async def prepare_clusters() -> int:
+    await prepare_database()
+    await engine.dispose()
+    return CONFIG.shard_count or await fetch_recommended_shard_count(CONFIG.discord_bot_token)
+
+
+def launch_clusters() -> None:
+    """Run the gateway shards across CONFIG.cluster_count worker processes."""
+    if CONFIG.db_url.startswith("sqlite"):
+        logger.warning("SQLite can't be safely shared between clusters, use Postgres instead")
+
+    shard_count = asyncio.run(prepare_clusters())
+    logger.info(f"Launching {CONFIG.cluster_count} clusters for {shard_count} shards")
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = [
+        ctx.Process(
+            target=run_cluster, args=(cluster_id, shard_count), name=f"cluster-{cluster_id}"
+        )
+        for cluster_id in range(CONFIG.cluster_count)
+    ]
+    for process in processes:
+        process.start()
+
+    with contextlib.suppress(KeyboardInterrupt):
+        for process in processes:
+            process.join()
 
 
 if __name__ == "__main__":
     setup_logging("logs/bot.log")
-    asyncio.run(main())
+    if CONFIG.cluster_count > 1:
+        launch_clusters()
+    else:
+        asyncio.run(main())
@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+from distrello.api import run_standalone
+from distrello.utils.logging import setup_logging
+
+if __name__ == "__main__":
+    setup_logging("logs/api.log")
+    run_standalone()